@@ -0,0 +1,366 @@
+# benchmarks.py
+"""
+ЗАМЕРЫ ПРОИЗВОДИТЕЛЬНОСТИ
+Запуск: python benchmarks.py [имя_замера ...]
+"""
+import os
+import sys
+import socket
+import time
+import random
+import tempfile
+import contextlib
+import ipaddress
+import tracemalloc
+import multiprocessing
+import numpy as np
+
+from cybersecurity import CyberSecuritySystem, DDoSProtection, EncryptionSystem, IPReputationIndex, SimulatedAttacks
+from neural_network import AdvancedTrafficAI
+from district_controller import DistrictController
+from tracking import ASSIGNMENT_METHODS, PedestrianTracker
+from traffic_trace import TraceReplayer, record_simulation
+from shared_rate_limit import SharedRateLimitTable
+from flood_sketch import FloodSketch
+
+
+def benchmark_integrity_modes(records=5000):
+    """Записей аудита в секунду для каждого режима контроля целостности"""
+    audit_record = {
+        "ip": "192.168.1.100",
+        "user": "traffic_control",
+        "command": "traffic_analysis",
+        "timestamp": "2024-01-01T12:00:00",
+        "threat_analysis": {"threat_level": "low", "threat_score": 0, "detected_threats": []}
+    }
+    results = {}
+    for mode in EncryptionSystem.INTEGRITY_MODES:
+        encryption = EncryptionSystem(integrity_mode=mode)
+        # PBKDF2 на несколько порядков медленнее - меряем на меньшей выборке
+        count = max(records // 250, 10) if mode == "pbkdf2" else records
+        
+        start = time.perf_counter()
+        for _ in range(count):
+            encryption.encrypt_data(audit_record)
+        elapsed = time.perf_counter() - start
+        
+        results[mode] = count / elapsed
+        print(f"   {mode:<12} {results[mode]:>12,.0f} записей/с")
+    return results
+
+
+def benchmark_ip_reputation(prefixes=200000, lookups=200000, seed=0):
+    """Загрузка блоклиста из файла, память индекса и задержка поиска по префиксу"""
+    rng = random.Random(seed)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as blocklist:
+        for i in range(prefixes):
+            if i % 10 == 0:
+                network = ipaddress.IPv6Network((rng.getrandbits(128), rng.randint(32, 64)), strict=False)
+            else:
+                network = ipaddress.IPv4Network((rng.getrandbits(32), rng.randint(12, 32)), strict=False)
+            blocklist.write(f"{network} list_{i % 50}\n")
+        path = blocklist.name
+    
+    try:
+        start = time.perf_counter()
+        index = IPReputationIndex()
+        index.load_file(path)
+        load_time = time.perf_counter() - start
+        
+        # Память меряется отдельной загрузкой: tracemalloc сильно замедляет разбор
+        del index
+        tracemalloc.start()
+        index = IPReputationIndex()
+        index.load_file(path)
+        index_memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        os.unlink(path)
+    
+    queries = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(lookups)]
+    queries += [str(ipaddress.IPv6Address(rng.getrandbits(128))) for _ in range(lookups // 10)]
+    start = time.perf_counter()
+    hits = sum(1 for ip in queries if index.lookup(ip) is not None)
+    lookup_time = time.perf_counter() - start
+    
+    # Доля разбора адреса: inet_pton дает нижнюю границу задержки поиска
+    start = time.perf_counter()
+    for ip in queries:
+        socket.inet_pton(socket.AF_INET6 if ":" in ip else socket.AF_INET, ip)
+    parse_time = time.perf_counter() - start
+    
+    results = {
+        "prefixes": len(index),
+        "load_seconds": load_time,
+        "index_bytes": index_memory,
+        "lookup_ns": lookup_time / len(queries) * 1e9,
+        "parse_ns": parse_time / len(queries) * 1e9,
+        "hit_rate": hits / len(queries)
+    }
+    print(f"   Префиксов: {results['prefixes']:,} (загрузка {load_time:.2f} с)")
+    print(f"   Память индекса: {index_memory / 2**20:.1f} МБ")
+    print(f"   Поиск: {results['lookup_ns']:.0f} нс/адрес, попаданий {results['hit_rate']:.1%}")
+    print(f"   Из них разбор адреса: {results['parse_ns']:.0f} нс")
+    return results
+
+
+def benchmark_district(intersections=10000, ticks=20, seed=0):
+    """Решений по перекресткам в секунду: один процесс и шарды по ядрам"""
+    results = {}
+    for shards in sorted({1, os.cpu_count() or 1}):
+        controller = DistrictController(intersections, shards=shards, seed=seed)
+        try:
+            stats = controller.run(ticks)
+        finally:
+            controller.close()
+        results[shards] = stats
+        print(f"   Шардов: {shards:2d} - {stats['decisions_per_second']:,.0f} решений/с "
+              f"({stats['seconds'] / ticks * 1000:.1f} мс на такт района)")
+    return results
+
+
+def benchmark_tracking(objects=500, frames=50, seed=0):
+    """Кадров в секунду и устойчивость id трекера на objects движущихся пешеходах"""
+    rng = np.random.default_rng(seed)
+    start_positions = rng.uniform(0, 500, (objects, 2))
+    velocities = rng.normal(0, 1.0, (objects, 2))
+    
+    results = {}
+    for method in ASSIGNMENT_METHODS:
+        tracker = PedestrianTracker(max_distance=3.0, method=method)
+        positions = start_positions
+        previous = None
+        kept = compared = 0
+        elapsed = 0.0
+        for _ in range(frames):
+            positions = positions + velocities + rng.normal(0, 0.1, positions.shape)
+            start = time.perf_counter()
+            track_ids = tracker.update(positions)
+            elapsed += time.perf_counter() - start
+            if previous is not None:
+                kept += int((track_ids == previous).sum())
+                compared += len(track_ids)
+            previous = track_ids
+        results[method] = {
+            "frames_per_second": frames / elapsed,
+            "ms_per_frame": elapsed / frames * 1000,
+            "id_stability": kept / compared
+        }
+        print(f"   {method:9s}: {results[method]['ms_per_frame']:.2f} мс/кадр "
+              f"({objects} объектов), устойчивость id {results[method]['id_stability']:.1%}")
+    return results
+
+
+def benchmark_replay(cycles=500, seed=0):
+    """Воспроизведение записанной трассы через make_decision и authenticate_request"""
+    # Общий секрет: системы воспроизведения принимают записанный легитимный токен
+    jwt_secret = random.Random(seed).randbytes(32)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "traffic.trace")
+        record_simulation(
+            path, cycles, AdvancedTrafficAI(verbose=False, seed=seed),
+            SimulatedAttacks(seed=seed), CyberSecuritySystem(async_audit=False, jwt_secret=jwt_secret)
+        )
+        with TraceReplayer(path) as replayer:
+            results = {
+                "trace_bytes": os.path.getsize(path),
+                "decisions": replayer.replay_decisions(AdvancedTrafficAI(verbose=False)),
+                "requests": replayer.replay_requests(
+                    CyberSecuritySystem(async_audit=False, jwt_secret=jwt_secret)
+                ),
+                "requests_batched": replayer.replay_requests(
+                    CyberSecuritySystem(async_audit=False, jwt_secret=jwt_secret), batch_size=64
+                )
+            }
+    
+    print(f"   Трасса: {cycles} циклов, {results['trace_bytes'] / 1024:.0f} КБ")
+    for name in ("decisions", "requests", "requests_batched"):
+        stats = results[name]
+        print(f"   {name:16s}: {stats['per_second']:,.0f}/с, p50 {stats['p50_ms']:.3f} мс, p99 {stats['p99_ms']:.3f} мс")
+    return results
+
+
+def _rate_limit_worker(stream, attacker_ip, shared_limits, barrier, results):
+    """Рабочий процесс: свой DDoSProtection, поток (время, IP) по секундам"""
+    protection = DDoSProtection(shared_limits)
+    allowed = handled = 0
+    elapsed = 0.0
+    for second in stream:
+        barrier.wait()  # процессы идут по симулированному времени вместе
+        start = time.perf_counter()
+        for current_time, ip_address in second:
+            verdict = protection.check_batch([(ip_address, "system_status", "TrafficAI/1.0")], current_time)[0]
+            if ip_address == attacker_ip and verdict["allowed"]:
+                allowed += 1
+        elapsed += time.perf_counter() - start
+        handled += len(second)
+    results.put((allowed, handled, elapsed))
+
+
+def benchmark_shared_rate_limit(workers=4, seconds=120, clients=200, attacker_rate=2.5, seed=0):
+    """Лимит одного IP, атакующего все рабочие процессы: локальные счетчики
+    против общей таблицы в shared memory"""
+    rng = np.random.default_rng(seed)
+    attacker_ip = "203.0.113.66"
+    base = time.time()
+    
+    # Атакующий равномерно распределен по процессам и в каждом остается
+    # ниже локального лимита; легитимные клиенты - по 2 запроса в минуту
+    streams = []
+    for _ in range(workers):
+        events = []
+        for ip_address, rate in [(attacker_ip, attacker_rate / workers)] + [
+            (f"10.0.{i // 256}.{i % 256}", 2 / 60 / workers) for i in range(clients)
+        ]:
+            times = np.cumsum(rng.exponential(1 / rate, int(seconds * rate * 2) + 10))
+            events.extend((float(t), ip_address) for t in times[times < seconds])
+        events.sort()
+        streams.append([
+            [(base + t, ip_address) for t, ip_address in events if int(t) == second]
+            for second in range(seconds)
+        ])
+    attacker_requests = sum(ip == attacker_ip for stream in streams for second in stream for _, ip in second)
+    
+    results = {}
+    for backend in ("local", "shared"):
+        shared_limits = SharedRateLimitTable() if backend == "shared" else None
+        barrier = multiprocessing.Barrier(workers)
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_rate_limit_worker, args=(stream, attacker_ip, shared_limits, barrier, queue)
+            )
+            for stream in streams
+        ]
+        try:
+            for process in processes:
+                process.start()
+            reports = [queue.get() for _ in processes]
+            for process in processes:
+                process.join()
+        finally:
+            if shared_limits is not None:
+                shared_limits.close()
+        
+        handled = sum(report[1] for report in reports)
+        elapsed = max(report[2] for report in reports)
+        results[backend] = {
+            "attacker_requests": attacker_requests,
+            "attacker_allowed": sum(report[0] for report in reports),
+            "requests": handled,
+            "requests_per_second": handled / elapsed if elapsed else float("inf")
+        }
+        print(f"   {backend:6s}: пропущено {results[backend]['attacker_allowed']}/{attacker_requests} "
+              f"запросов атакующего, {results[backend]['requests_per_second']:,.0f} запросов/с "
+              f"({workers} процесса)")
+    return results
+
+
+def benchmark_flood_sketch(spoofed=200000, attackers=20, attacker_requests=300, seconds=60, seed=0):
+    """Флуд с подменой адресов: точная история против Count-Min Sketch + top-k
+    (память, пропускная способность, найденные атакующие)"""
+    rng = np.random.default_rng(seed)
+    base = time.time()
+    attacker_ips = [f"198.51.100.{i}" for i in range(attackers)]
+    
+    # Каждый подмененный адрес шлет один запрос, атакующие - по attacker_requests
+    ips = [str(ipaddress.IPv4Address(int(value))) for value in rng.integers(1 << 24, 1 << 32, spoofed)]
+    ips += [ip for ip in attacker_ips for _ in range(attacker_requests)]
+    order = rng.permutation(len(ips))
+    times = base + np.sort(rng.uniform(0, seconds, len(ips)))
+    stream = [(ips[i], float(t)) for i, t in zip(order.tolist(), times)]
+    
+    results = {}
+    for mode in ("exact", "sketch"):
+        # Защита (и массивы Count-Min) создаются внутри замера памяти
+        tracemalloc.start()
+        sketch = FloodSketch() if mode == "sketch" else None
+        protection = DDoSProtection(sketch=sketch)
+        start = time.perf_counter()
+        for ip_address, current_time in stream:
+            protection.check_batch([(ip_address, "system_status", "")], current_time)
+        elapsed = time.perf_counter() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        blocked = set(protection.blocked_ips)
+        results[mode] = {
+            "requests_per_second": len(stream) / elapsed,
+            "memory_bytes": memory,
+            "tracked_ips": sum(1 for log in protection.request_log.values() if log),
+            "attackers_blocked": len(blocked & set(attacker_ips)),
+            "false_blocks": len(blocked - set(attacker_ips))
+        }
+        print(f"   {mode:6s}: {results[mode]['requests_per_second']:,.0f} запросов/с, "
+              f"память {memory / 2**20:.1f} МБ, точная история {results[mode]['tracked_ips']:,} IP, "
+              f"заблокировано атакующих {results[mode]['attackers_blocked']}/{attackers}, "
+              f"лишних блокировок {results[mode]['false_blocks']}")
+    return results
+
+
+def benchmark_prefilter(requests=20000, seed=0):
+    """Атакующий трафик (заблокированные IP, отозванный токен, sqlmap):
+    запросов в секунду и событий монитора с ранним отсевом и без него"""
+    rng = random.Random(seed)
+    results = {}
+    for enabled in (False, True):
+        security = CyberSecuritySystem(async_audit=False, prefilter=enabled)
+        token = security.authentication.issue_token("intruder", "maintenance", ["status_check"])
+        security.authentication.revoke_token(token)
+        valid_token = security.authentication.issue_token("operator", "maintenance", ["status_check"])
+        now = time.time()
+        for i in range(100):
+            security.ddos_protection._block_ip(f"203.0.113.{i}", now)
+        
+        stream = []
+        for _ in range(requests):
+            kind = rng.randrange(3)
+            if kind == 0:
+                stream.append((f"203.0.113.{rng.randrange(100)}", valid_token, "Mozilla/5.0"))
+            elif kind == 1:
+                stream.append((f"10.{rng.randrange(256)}.{rng.randrange(256)}.1", token, "Mozilla/5.0"))
+            else:
+                stream.append((f"10.{rng.randrange(256)}.{rng.randrange(256)}.2", valid_token, "sqlmap/1.7"))
+        
+        # Без отсева монитор печатает оповещение почти на каждый запрос
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for ip_address, request_token, user_agent in stream:
+                security.authenticate_request(ip_address, request_token, "system_status", user_agent)
+            elapsed = time.perf_counter() - start
+        security.shutdown()
+        
+        mode = "prefilter" if enabled else "full"
+        results[mode] = {
+            "requests_per_second": len(stream) / elapsed,
+            "monitor_events": security.monitor.incident_counter,
+            "tracked_ips": len(security.ddos_protection.request_log)
+        }
+        print(f"   {mode:9s}: {results[mode]['requests_per_second']:,.0f} запросов/с, "
+              f"событий монитора {results[mode]['monitor_events']:,}, "
+              f"IP в истории DDoS {results[mode]['tracked_ips']:,}")
+    return results
+
+
+BENCHMARKS = {
+    "integrity": benchmark_integrity_modes,
+    "ip_reputation": benchmark_ip_reputation,
+    "district": benchmark_district,
+    "tracking": benchmark_tracking,
+    "replay": benchmark_replay,
+    "shared_rate_limit": benchmark_shared_rate_limit,
+    "flood_sketch": benchmark_flood_sketch,
+    "prefilter": benchmark_prefilter,
+}
+
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    for name in names:
+        print(f"\nЗАМЕР: {name}")
+        print("-" * 40)
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
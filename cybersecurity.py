@@ -8,18 +8,97 @@
 
 
 import numpy as np 
-import random
 import time
 import hashlib
+import hmac
+import base64
 import secrets
 import json
+import math
+import re
+import socket
+import bisect
+from array import array
+import queue
+import atexit
+import itertools
+import threading
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from collections import defaultdict, deque, OrderedDict
+from event_log import SecurityEventLog
+
+class _IPTrafficStats:
+    """Инкрементальная статистика запросов одного IP.
+
+    Обновляется при добавлении и устаревании запросов, поэтому
+    классификация флуда, ботнета и сканирования стоит O(1).
+    """
+    __slots__ = ("recent", "window", "diff_count", "diff_mean", "diff_m2", "command_counts")
+
+    def __init__(self):
+        self.recent = deque()       # метки времени за окно флуда (30 с)
+        self.window = deque()       # метки времени за окно анализа (лимиты)
+        self.diff_count = 0         # Уэлфорд по интервалам между запросами
+        self.diff_mean = 0.0
+        self.diff_m2 = 0.0
+        self.command_counts = {}    # тип команды -> число запросов в истории
+
+    def add_diff(self, diff):
+        """Добавляет интервал между соседними запросами"""
+        self.diff_count += 1
+        delta = diff - self.diff_mean
+        self.diff_mean += delta / self.diff_count
+        self.diff_m2 += delta * (diff - self.diff_mean)
+
+    def remove_diff(self, diff):
+        """Убирает самый старый интервал (обратный шаг Уэлфорда)"""
+        if self.diff_count <= 1:
+            self.diff_count = 0
+            self.diff_mean = 0.0
+            self.diff_m2 = 0.0
+            return
+        old_mean = self.diff_mean
+        self.diff_count -= 1
+        self.diff_mean = (old_mean * (self.diff_count + 1) - diff) / self.diff_count
+        self.diff_m2 = max(0.0, self.diff_m2 - (diff - old_mean) * (diff - self.diff_mean))
+
+    def diff_std(self):
+        """Стандартное отклонение интервалов (как np.std, ddof=0)"""
+        if not self.diff_count:
+            return 0.0
+        return math.sqrt(self.diff_m2 / self.diff_count)
+
+    def add_command(self, command):
+        self.command_counts[command] = self.command_counts.get(command, 0) + 1
+
+    def remove_command(self, command):
+        count = self.command_counts.get(command, 0) - 1
+        if count > 0:
+            self.command_counts[command] = count
+        else:
+            self.command_counts.pop(command, None)
+
+    def expire(self, current_time, analysis_window, flood_window):
+        """Снимает устаревшие метки с начала окон"""
+        while self.window and current_time - self.window[0] >= analysis_window:
+            self.window.popleft()
+        while self.recent and current_time - self.recent[0] >= flood_window:
+            self.recent.popleft()
 
 class DDoSProtection:
-    """Защита от DDoS-атак с детектированием паттернов"""
+    """Защита от DDoS-атак с детектированием паттернов.
     
-    def __init__(self):
+    shared_limits - SharedRateLimitTable: лимит запросов IP, блокировки и
+    наблюдение становятся общими для всех процессов узла (анализ паттернов
+    атак остается локальным).
+    sketch - FloodSketch: вероятностный режим для флуда с миллионами
+    адресов; точная история ведется только для подозреваемых IP из top-k,
+    остальные запросы учитываются в Count-Min Sketch фиксированного размера.
+    """
+    
+    def __init__(self, shared_limits=None, sketch=None):
+        self.shared_limits = shared_limits
+        self.sketch = sketch
         self.request_log = defaultdict(deque)
         self.blocked_ips = {}
         self.suspicious_ips = {}
@@ -32,14 +111,60 @@ class DDoSProtection:
         }
         self.block_time = 300  # 5 минут блокировки
         self.analysis_window = 60  # окно анализа в секундах
+        self.flood_window = 30  # окно детектирования флуда в секундах
+        self.retention_window = 300  # сколько хранить историю запросов IP
+        self.sweep_batch = 32  # сколько чужих IP проверяется за один запрос
+        
+        # Инкрементальная статистика по каждому IP из request_log
+        self._ip_stats = defaultdict(_IPTrafficStats)
+        # Очередь IP для фоновой очистки (каждый IP присутствует один раз)
+        self._sweep_queue = deque()
         
     def check_request(self, ip_address, request_type, user_agent=""):
         """Проверяет запрос на DDoS и подозрительную активность"""
         current_time = time.time()
         
-        # Очистка старых данных
-        self._clean_old_requests(current_time)
+        # Очистка старых данных: только текущий IP + ограниченная порция остальных
+        self._expire_ip(ip_address, current_time)
+        self._sweep_expired(current_time)
         
+        return self._evaluate_request(ip_address, request_type, user_agent, current_time)
+    
+    def check_batch(self, requests, current_time=None):
+        """Проверяет пакет запросов [(ip, тип, user_agent), ...] за одно чтение часов.
+        
+        Запросы группируются по IP: состояние разных IP независимо, поэтому
+        вердикты совпадают с последовательными вызовами check_request. С
+        shared_limits или sketch состояние общее для всех IP (корзины таблицы,
+        счетчики Count-Min и top-k), и запросы проверяются в исходном порядке.
+        """
+        if current_time is None:
+            current_time = time.time()
+        self._sweep_expired(current_time)
+        
+        if self.shared_limits is not None or self.sketch is not None:
+            results = []
+            for ip_address, request_type, user_agent in requests:
+                self._expire_ip(ip_address, current_time)
+                results.append(self._evaluate_request(ip_address, request_type, user_agent, current_time))
+            return results
+        
+        groups = defaultdict(list)
+        for index, (ip_address, _, _) in enumerate(requests):
+            groups[ip_address].append(index)
+        
+        results = [None] * len(requests)
+        for ip_address, indices in groups.items():
+            self._expire_ip(ip_address, current_time)
+            for index in indices:
+                _, request_type, user_agent = requests[index]
+                results[index] = self._evaluate_request(
+                    ip_address, request_type, user_agent, current_time
+                )
+        return results
+    
+    def _evaluate_request(self, ip_address, request_type, user_agent, current_time):
+        """Выносит вердикт по запросу (история IP уже очищена)"""
         # Проверка блокировки
         if self._is_ip_blocked(ip_address, current_time):
             return {
@@ -48,6 +173,14 @@ class DDoSProtection:
                 "threat_level": "high"
             }
         
+        # Вероятностный режим: IP вне подозреваемых не получает точной истории
+        if self.sketch is not None:
+            estimate, evicted = self.sketch.observe(ip_address, current_time)
+            if evicted is not None:
+                self._forget_ip(evicted)
+            if not self.sketch.is_suspect(ip_address, estimate):
+                return {"allowed": True, "message": "OK", "threat_level": "low"}
+        
         # Логирование запроса
         request_data = {
             "time": current_time,
@@ -55,13 +188,25 @@ class DDoSProtection:
             "user_agent": user_agent,
             "size": len(str(request_type)) + len(user_agent)
         }
-        self.request_log[ip_address].append(request_data)
+        if ip_address not in self.request_log:
+            self._sweep_queue.append(ip_address)
+        log = self.request_log[ip_address]
+        stats = self._ip_stats[ip_address]
+        if log:
+            stats.add_diff(current_time - log[-1]["time"])
+        log.append(request_data)
+        stats.window.append(current_time)
+        stats.recent.append(current_time)
+        stats.add_command(request_type)
+        global_count = (
+            self.shared_limits.hit(ip_address, current_time) if self.shared_limits is not None else None
+        )
         
         # Анализ угроз
         threat_analysis = self._analyze_threat_patterns(ip_address, current_time)
         
         if threat_analysis["threat_level"] == "critical":
-            self.blocked_ips[ip_address] = current_time + self.block_time
+            self._block_ip(ip_address, current_time)
             return {
                 "allowed": False,
                 "message": f"Обнаружена {threat_analysis['attack_type']} атака! IP заблокирован",
@@ -69,6 +214,8 @@ class DDoSProtection:
             }
         elif threat_analysis["threat_level"] == "high":
             self.suspicious_ips[ip_address] = current_time + 600  # 10 минут наблюдения
+            if self.shared_limits is not None:
+                self.shared_limits.mark_suspicious(ip_address, current_time + 600, current_time)
             return {
                 "allowed": False,
                 "message": "Подозрительная активность обнаружена",
@@ -76,7 +223,7 @@ class DDoSProtection:
             }
         
         # Проверка лимитов запросов
-        limit_check = self._check_rate_limits(ip_address, current_time, request_type)
+        limit_check = self._check_rate_limits(ip_address, current_time, request_type, global_count)
         if not limit_check["allowed"]:
             return limit_check
         
@@ -87,65 +234,70 @@ class DDoSProtection:
         }
     
     def _analyze_threat_patterns(self, ip_address, current_time):
-        """Анализирует паттерны атак"""
-        requests = list(self.request_log[ip_address])
+        """Анализирует паттерны атак по инкрементальной статистике IP"""
+        total_requests = len(self.request_log[ip_address])
+        stats = self._ip_stats[ip_address]
         
-        if len(requests) < 5:
+        if total_requests < 5:
             return {"threat_level": "low", "attack_type": None}
         
-        # Анализ временных паттернов
-        timestamps = [req["time"] for req in requests]
-        recent_requests = [req for req in requests if current_time - req["time"] < 30]
-        
         # Детектирование флуд-атаки
-        if len(recent_requests) > 50:
+        if len(stats.recent) > 50:
             return {"threat_level": "critical", "attack_type": "флуд-атака"}
         
         # Детектирование ботнета (равномерные запросы)
-        if len(requests) > 10:
-            time_diffs = [timestamps[i] - timestamps[i-1] for i in range(1, len(timestamps))]
-            if len(time_diffs) > 5:
-                avg_diff = np.mean(time_diffs)
-                std_diff = np.std(time_diffs)
-                
-                if std_diff < 0.05:  # Слишком равномерно
-                    return {"threat_level": "critical", "attack_type": "ботнет"}
+        if total_requests > 10 and stats.diff_count > 5:
+            if stats.diff_std() < 0.05:  # Слишком равномерно
+                return {"threat_level": "critical", "attack_type": "ботнет"}
         
         # Детектирование сканирования уязвимостей
-        unique_commands = len(set(req["type"] for req in requests))
-        if unique_commands > 15 and len(requests) > 20:
+        unique_commands = len(stats.command_counts)
+        if unique_commands > 15 and total_requests > 20:
             return {"threat_level": "high", "attack_type": "сканирование"}
         
         return {"threat_level": "low", "attack_type": None}
     
-    def _check_rate_limits(self, ip_address, current_time, request_type):
-        """Проверяет ограничения частоты запросов"""
+    def _check_rate_limits(self, ip_address, current_time, request_type, global_count=None):
+        """Проверяет ограничения частоты запросов (global_count - оценка
+        по общей таблице процессов, если она подключена)"""
         # Определяем лимит в зависимости от типа IP и команды
-        if ip_address in self.suspicious_ips:
+        if ip_address in self.suspicious_ips or (
+            self.shared_limits is not None and self.shared_limits.is_suspicious(ip_address, current_time)
+        ):
             rate_limit = self.rate_limits["suspicious"]
         elif request_type in ["system_shutdown", "config_change"]:
             rate_limit = self.rate_limits["critical"]
         else:
             rate_limit = self.rate_limits["normal"]
         
-        # Подсчет запросов за последнюю минуту
-        recent_requests = [
-            req for req in self.request_log[ip_address] 
-            if current_time - req["time"] < 60
-        ]
+        # Подсчет запросов за окно анализа (окно уже очищено в _expire_ip)
+        recent_count = len(self._ip_stats[ip_address].window)
+        if global_count is not None:
+            recent_count = max(recent_count, int(global_count))
         
-        if len(recent_requests) > rate_limit:
-            self.blocked_ips[ip_address] = current_time + self.block_time
+        if recent_count > rate_limit:
+            self._block_ip(ip_address, current_time)
             return {
                 "allowed": False,
-                "message": f"Превышен лимит запросов: {len(recent_requests)}/{rate_limit}",
+                "message": f"Превышен лимит запросов: {recent_count}/{rate_limit}",
                 "threat_level": "high"
             }
         
         return {"allowed": True}
     
+    def _block_ip(self, ip_address, current_time):
+        self.blocked_ips[ip_address] = current_time + self.block_time
+        if self.shared_limits is not None:
+            self.shared_limits.block(ip_address, current_time + self.block_time, current_time)
+    
+    def is_blocked(self, ip_address, current_time=None):
+        """Проверяет блокировку IP без учета запроса в истории"""
+        if current_time is None:
+            current_time = time.time()
+        return self._is_ip_blocked(ip_address, current_time)
+    
     def _is_ip_blocked(self, ip_address, current_time):
-        """Проверяет блокировку IP"""
+        """Проверяет блокировку IP (локальную и общую для процессов)"""
         if ip_address in self.blocked_ips:
             if current_time < self.blocked_ips[ip_address]:
                 return True
@@ -153,25 +305,267 @@ class DDoSProtection:
                 del self.blocked_ips[ip_address]
                 if ip_address in self.suspicious_ips:
                     del self.suspicious_ips[ip_address]
+        if self.shared_limits is not None:
+            return self.shared_limits.is_blocked(ip_address, current_time)
         return False
     
+    def _expire_ip(self, ip_address, current_time):
+        """Удаляет устаревшие записи одного IP (амортизированно O(1))"""
+        log = self.request_log.get(ip_address)
+        stats = self._ip_stats.get(ip_address)
+        if log:
+            while log and current_time - log[0]["time"] >= self.retention_window:
+                oldest = log.popleft()
+                if stats is not None:
+                    stats.remove_command(oldest["type"])
+                    if log:
+                        stats.remove_diff(log[0]["time"] - oldest["time"])
+        if stats is not None:
+            stats.expire(current_time, self.analysis_window, self.flood_window)
+    
+    def _forget_ip(self, ip_address):
+        """Удаляет точную историю IP (блокировки сохраняются); пустой журнал
+        остается в очереди очистки и будет удален ею"""
+        log = self.request_log.get(ip_address)
+        if log is not None:
+            log.clear()
+        self._ip_stats.pop(ip_address, None)
+    
+    def _sweep_expired(self, current_time, batch=None):
+        """Фоновая очистка: проверяет не более batch IP из очереди"""
+        batch = self.sweep_batch if batch is None else batch
+        for _ in range(min(batch, len(self._sweep_queue))):
+            ip = self._sweep_queue.popleft()
+            self._expire_ip(ip, current_time)
+            if self.request_log.get(ip):
+                self._sweep_queue.append(ip)
+            else:
+                self.request_log.pop(ip, None)
+                self._ip_stats.pop(ip, None)
+    
     def _clean_old_requests(self, current_time):
-        """Очищает старые записи"""
-        for ip in list(self.request_log.keys()):
-            self.request_log[ip] = deque(
-                req for req in self.request_log[ip] 
-                if current_time - req["time"] < 300
-            )
-            if not self.request_log[ip]:
-                del self.request_log[ip]
+        """Полная очистка старых записей по всем IP"""
+        self._sweep_expired(current_time, batch=len(self._sweep_queue))
+
+class _TokenRecord:
+    """Запись таблицы токенов; сроки - секунды epoch"""
+    __slots__ = ("username", "role", "permissions", "permission_set", "created", "expires")
+    
+    def __init__(self, username, role, permissions, created, expires):
+        self.username = username
+        self.role = role
+        self.permissions = list(permissions)
+        self.permission_set = frozenset(permissions)
+        self.created = created
+        self.expires = expires
+    
+    def __getitem__(self, key):
+        # Совместимость со словарным представлением записи
+        return getattr(self, key)
+
+class ExpiryWheel:
+    """Колесо таймеров: ключи с дедлайнами снимаются пачками по слотам.
+    
+    Слот - интервал resolution секунд; ключ, чей дедлайн дальше одного
+    оборота колеса, остается в слоте до нужного оборота. Отмена ленивая:
+    ключ без актуального дедлайна выбрасывается при проходе слота.
+    """
+    
+    def __init__(self, resolution=1.0, slots=4096, start=None):
+        self.resolution = resolution
+        self._slots = [set() for _ in range(slots)]
+        self._deadlines = {}  # ключ -> (дедлайн, номер слота)
+        self._tick = int((time.time() if start is None else start) // resolution)
+    
+    def schedule(self, key, deadline):
+        tick = max(int(deadline // self.resolution), self._tick + 1)
+        index = tick % len(self._slots)
+        self._deadlines[key] = (deadline, index)
+        self._slots[index].add(key)
+    
+    def cancel(self, key):
+        self._deadlines.pop(key, None)
+    
+    def advance(self, now):
+        """Сдвигает колесо до now и возвращает ключи с дедлайном <= now.
+        
+        Проходятся только полностью истекшие слоты, поэтому ключ снимается
+        с опозданием не больше resolution, но никогда не пропускается.
+        """
+        tick = int(now // self.resolution) - 1
+        if tick <= self._tick:
+            return []
+        
+        expired = []
+        deadlines = self._deadlines
+        num_slots = len(self._slots)
+        for current in range(self._tick + 1, self._tick + 1 + min(tick - self._tick, num_slots)):
+            index = current % num_slots
+            slot = self._slots[index]
+            if not slot:
+                continue
+            for key in list(slot):
+                entry = deadlines.get(key)
+                if entry is None or entry[1] != index:
+                    slot.discard(key)  # отменен или перенесен в другой слот
+                elif entry[0] <= now:
+                    slot.discard(key)
+                    del deadlines[key]
+                    expired.append(key)
+        self._tick = tick
+        return expired
+    
+    def __len__(self):
+        return len(self._deadlines)
+
+class FailedAttemptCounter:
+    """Счетчик неудачных попыток по токенам с TTL и ограничением размера.
+    
+    Запись живет ttl секунд после последней неудачи; при превышении
+    max_entries вытесняются самые старые (LRU), поэтому поток случайных
+    токенов при подборе занимает ограниченную память.
+    """
+    
+    def __init__(self, ttl=900.0, max_entries=100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # токен -> [число неудач, время последней]
+        self.stats = {"expired": 0, "evicted": 0}
+    
+    def get(self, token, now=None):
+        entry = self._entries.get(token)
+        if entry is None:
+            return 0
+        if (time.time() if now is None else now) - entry[1] > self.ttl:
+            return 0
+        return entry[0]
+    
+    def increment(self, token, now=None):
+        now = time.time() if now is None else now
+        self.expire(now)
+        entry = self._entries.get(token)
+        if entry is None:
+            entry = self._entries[token] = [0, now]
+        else:
+            self._entries.move_to_end(token)
+        entry[0] += 1
+        entry[1] = now
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evicted"] += 1
+        return entry[0]
+    
+    def reset(self, token):
+        self._entries.pop(token, None)
+    
+    def expire(self, now=None):
+        """Удаляет записи без неудач дольше ttl (они в начале порядка LRU)"""
+        now = time.time() if now is None else now
+        entries = self._entries
+        while entries:
+            token, entry = next(iter(entries.items()))
+            if now - entry[1] <= self.ttl:
+                break
+            del entries[token]
+            self.stats["expired"] += 1
+    
+    def __getitem__(self, token):
+        return self.get(token)
+    
+    def __len__(self):
+        return len(self._entries)
+
+def _b64url_encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64url_decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+class JWTSigner:
+    """Выпуск и проверка JWT с подписью HS256 (только стандартная библиотека).
+    
+    Узлы с общим secret проверяют токены друг друга без общего состояния.
+    Уже проверенные токены хранятся в LRU-кэше token -> claims, поэтому
+    повторная проверка не разбирает base64 и JSON.
+    """
+    
+    HEADER = _b64url_encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+    
+    def __init__(self, secret=None, issuer="traffic_control_system", cache_size=1024):
+        if isinstance(secret, str):
+            secret = secret.encode("utf-8")
+        self.secret = secret or secrets.token_bytes(32)
+        self.issuer = issuer
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.stats = {"cache_hits": 0, "cache_misses": 0, "invalid": 0}
+    
+    def issue(self, claims):
+        """Подписывает claims (iss добавляется автоматически)"""
+        claims = dict(claims, iss=self.issuer)
+        payload = _b64url_encode(json.dumps(claims, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+        signing_input = f"{self.HEADER}.{payload}"
+        return f"{signing_input}.{_b64url_encode(self._sign(signing_input))}"
+    
+    def verify(self, token):
+        """claims подлинного токена или None (срок действия проверяет вызывающий)"""
+        claims = self._cache.get(token)
+        if claims is not None:
+            self._cache.move_to_end(token)
+            self.stats["cache_hits"] += 1
+            return claims
+        self.stats["cache_misses"] += 1
+        
+        claims = self._parse(token)
+        if claims is None:
+            self.stats["invalid"] += 1
+            return None
+        self._cache[token] = claims
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return claims
+    
+    def _parse(self, token):
+        # Не-ASCII токен не может быть подлинным (и не кодируется для подписи)
+        if not isinstance(token, str) or not token.isascii() or token.count(".") != 2:
+            return None
+        header, payload, signature = token.split(".")
+        try:
+            signature_bytes = _b64url_decode(signature)
+        except (ValueError, TypeError):
+            return None
+        if not hmac.compare_digest(signature_bytes, self._sign(f"{header}.{payload}")):
+            return None
+        try:
+            if json.loads(_b64url_decode(header)).get("alg") != "HS256":
+                return None
+            claims = json.loads(_b64url_decode(payload))
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(claims, dict) or claims.get("iss") != self.issuer:
+            return None
+        return claims
+    
+    def _sign(self, signing_input):
+        return hmac.new(self.secret, signing_input.encode("ascii"), hashlib.sha256).digest()
 
 class AuthenticationSystem:
-    """Система аутентификации с JWT токенами и ролевой моделью"""
+    """Система аутентификации с JWT токенами и ролевой моделью.
     
-    def __init__(self):
+    Токены - JWT с подписью HS256: токен, выпущенный другим узлом с тем же
+    jwt_secret, принимается по подписи без записи в authorized_tokens.
+    Истекшие токены и отзывы снимаются колесом таймеров; отзыв хранится
+    до истечения срока токена (для неизвестных токенов - revocation_ttl).
+    """
+    
+    def __init__(self, failed_attempts_ttl=900.0, max_failed_entries=100000, revocation_ttl=86400.0,
+                 jwt_secret=None):
+        self.jwt = JWTSigner(jwt_secret)
         self.authorized_tokens = {}
         self.revoked_tokens = set()
-        self.failed_attempts = defaultdict(int)
+        self.failed_attempts = FailedAttemptCounter(failed_attempts_ttl, max_failed_entries)
+        self.revocation_ttl = revocation_ttl
+        self.expiry_wheel = ExpiryWheel()
         self.user_roles = {}
         
         # Инициализация системных учетных записей
@@ -182,50 +576,51 @@ class AuthenticationSystem:
         system_users = {
             "traffic_control": {
                 "role": "admin",
-                "permissions": ["full_control", "system_config", "basic_control"],
-                "token": self._generate_token("traffic_control")
+                "permissions": ["full_control", "system_config", "basic_control"]
             },
             "emergency_services": {
                 "role": "emergency", 
-                "permissions": ["priority_override", "emergency_stop"],
-                "token": self._generate_token("emergency_services")
+                "permissions": ["priority_override", "emergency_stop"]
             },
             "maintenance": {
                 "role": "maintenance",
-                "permissions": ["status_check", "basic_control"],
-                "token": self._generate_token("maintenance")
+                "permissions": ["status_check", "basic_control"]
             }
         }
         
         for username, data in system_users.items():
-            self.authorized_tokens[data["token"]] = {
-                "username": username,
-                "role": data["role"],
-                "permissions": data["permissions"],
-                "created": datetime.now(),
-                "expires": datetime.now() + timedelta(days=30)
-            }
+            self.issue_token(username, data["role"], data["permissions"])
             self.user_roles[username] = data["role"]
     
-    def _generate_token(self, username):
-        """Генерирует безопасный JWT-токен"""
-        header = {"alg": "HS256", "typ": "JWT"}
-        payload = {
+    def issue_token(self, username, role, permissions, lifetime=timedelta(days=30)):
+        """Выпускает подписанный токен и регистрирует его на этом узле"""
+        now = time.time()
+        expires = now + lifetime.total_seconds()
+        token = self._generate_token(username, role, permissions, now, expires)
+        self.add_token(token, username, role, permissions, now, expires)
+        return token
+    
+    def add_token(self, token, username, role, permissions, created, expires):
+        """Регистрирует токен; expires - секунды epoch"""
+        self.authorized_tokens[token] = _TokenRecord(username, role, permissions, created, expires)
+        self.expiry_wheel.schedule(("token", token), expires)
+    
+    def _generate_token(self, username, role, permissions, issued, expires):
+        """Генерирует подписанный JWT-токен (HS256)"""
+        return self.jwt.issue({
             "sub": username,
-            "iat": datetime.now().timestamp(),
-            "exp": (datetime.now() + timedelta(days=30)).timestamp(),
-            "iss": "traffic_control_system"
-        }
-        
-        # В реальной системе здесь была бы криптография
-        header_b64 = secrets.token_urlsafe(16)
-        payload_b64 = secrets.token_urlsafe(32)
-        signature = secrets.token_urlsafe(16)
-        
-        return f"{header_b64}.{payload_b64}.{signature}"
+            "role": role,
+            "permissions": list(permissions),
+            "iat": issued,
+            "exp": expires,
+            "jti": secrets.token_urlsafe(8)
+        })
     
     def verify_token(self, token, required_permission=None):
         """Проверяет токен и разрешения"""
+        now = time.time()
+        self._retire_expired(now)
+        
         # Проверка отозванных токенов
         if token in self.revoked_tokens:
             return {
@@ -235,27 +630,28 @@ class AuthenticationSystem:
             }
         
         # Проверка блокировки из-за неудачных попыток
-        if self.failed_attempts[token] > 5:
+        if self.failed_attempts.get(token, now) > 5:
             return {
                 "valid": False,
                 "reason": "Токен заблокирован из-за подозрительной активности", 
                 "threat_level": "high"
             }
         
-        # Проверка существования токена
-        if token not in self.authorized_tokens:
-            self.failed_attempts[token] += 1
+        # Проверка существования токена: локальная таблица, затем подпись
+        token_data = self.authorized_tokens.get(token)
+        if token_data is None:
+            token_data = self._token_from_claims(self.jwt.verify(token))
+        if token_data is None:
+            self.failed_attempts.increment(token, now)
             return {
                 "valid": False,
                 "reason": "Недействительный токен",
                 "threat_level": "medium"
             }
         
-        token_data = self.authorized_tokens[token]
-        
         # Проверка срока действия
-        if datetime.now() > token_data["expires"]:
-            self.revoked_tokens.add(token)
+        if now > token_data.expires:
+            self._add_revocation(token, now + self.revocation_ttl)
             return {
                 "valid": False,
                 "reason": "Срок действия токена истек",
@@ -263,7 +659,7 @@ class AuthenticationSystem:
             }
         
         # Проверка разрешений
-        if required_permission and required_permission not in token_data["permissions"]:
+        if required_permission and required_permission not in token_data.permission_set:
             return {
                 "valid": False,
                 "reason": f"Недостаточно прав: требуется {required_permission}",
@@ -271,27 +667,85 @@ class AuthenticationSystem:
             }
         
         # Сброс счетчика неудачных попыток при успешной аутентификации
-        self.failed_attempts[token] = 0
+        self.failed_attempts.reset(token)
         
         return {
             "valid": True,
-            "username": token_data["username"],
-            "role": token_data["role"],
-            "permissions": token_data["permissions"]
+            "username": token_data.username,
+            "role": token_data.role,
+            "permissions": token_data.permissions
         }
     
     def revoke_token(self, token):
         """Отзывает токен"""
+        now = time.time()
+        token_data = self.authorized_tokens.pop(token, None)
+        self.expiry_wheel.cancel(("token", token))
+        if token_data is None:
+            token_data = self._token_from_claims(self.jwt.verify(token))
+        retire_at = token_data.expires if token_data is not None else now + self.revocation_ttl
+        self._add_revocation(token, max(retire_at, now))
+    
+    def _token_from_claims(self, claims):
+        """Запись токена другого узла по проверенным claims"""
+        if claims is None:
+            return None
+        try:
+            return _TokenRecord(claims["sub"], claims["role"], claims["permissions"],
+                                float(claims["iat"]), float(claims["exp"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+    
+    def _add_revocation(self, token, retire_at):
         self.revoked_tokens.add(token)
-        if token in self.authorized_tokens:
-            del self.authorized_tokens[token]
+        self.expiry_wheel.schedule(("revoked", token), retire_at)
+    
+    def _retire_expired(self, now):
+        """Снимает истекшие токены (они становятся отозванными) и устаревшие отзывы"""
+        for kind, token in self.expiry_wheel.advance(now):
+            if kind == "token":
+                if self.authorized_tokens.pop(token, None) is not None:
+                    self._add_revocation(token, now + self.revocation_ttl)
+            else:
+                self.revoked_tokens.discard(token)
 
 class EncryptionSystem:
-    """Система шифрования и целостности данных"""
+    """Система шифрования и целостности данных.
     
-    def __init__(self):
-        self.encryption_key = secrets.token_bytes(32)
-        self.hmac_key = secrets.token_bytes(32)
+    Экземпляры с одинаковыми master_key и key_salt выводят одинаковые ключи
+    и проверяют пакеты друг друга. Без key_salt для заданного master_key
+    используется фиксированная соль DEFAULT_KEY_SALT, для случайного -
+    случайная.
+    """
+    
+    # Режимы контроля целостности: однопроходные MAC и медленный PBKDF2 (совместимость)
+    INTEGRITY_MODES = ("hmac-sha256", "blake2b", "pbkdf2")
+    DEFAULT_KEY_SALT = b"traffic-control-audit-keys"
+    
+    def __init__(self, integrity_mode="hmac-sha256", master_key=None, key_salt=None):
+        if integrity_mode not in self.INTEGRITY_MODES:
+            raise ValueError(f"Неизвестный режим целостности: {integrity_mode}")
+        self.integrity_mode = integrity_mode
+        
+        # PBKDF2 используется только один раз - для вывода ключей при запуске
+        if key_salt is None:
+            key_salt = self.DEFAULT_KEY_SALT if master_key else secrets.token_bytes(16)
+        master_key = master_key or secrets.token_bytes(32)
+        self.key_salt = key_salt
+        derived = hashlib.pbkdf2_hmac('sha256', master_key, self.key_salt, 100000, dklen=64)
+        self.encryption_key = derived[:32]
+        self.hmac_key = derived[32:]
+    
+    def _compute_mac(self, data_bytes, mode=None):
+        """Вычисляет код целостности данных в заданном режиме"""
+        mode = mode or self.integrity_mode
+        if mode == "hmac-sha256":
+            return hmac.new(self.hmac_key, data_bytes, hashlib.sha256).hexdigest()
+        if mode == "blake2b":
+            return hashlib.blake2b(data_bytes, key=self.hmac_key, digest_size=32).hexdigest()
+        if mode == "pbkdf2":
+            return hashlib.pbkdf2_hmac('sha256', data_bytes, self.hmac_key, 100000).hex()
+        raise ValueError(f"Неизвестный режим целостности: {mode}")
         
     def encrypt_data(self, data):
         """Шифрует данные с использованием AES-256 (упрощенная версия)"""
@@ -302,20 +756,16 @@ class EncryptionSystem:
         # Для демонстрации используем HMAC + хеширование
         data_bytes = data.encode('utf-8')
         
-        # HMAC для целостности
-        hmac = hashlib.pbkdf2_hmac(
-            'sha256', 
-            data_bytes, 
-            self.hmac_key, 
-            100000
-        ).hex()
+        # MAC для целостности
+        mac = self._compute_mac(data_bytes)
         
         # "Шифрование" (в реальности - AES)
         encrypted = hashlib.sha256(data_bytes + self.encryption_key).hexdigest()
         
         return {
             "encrypted_data": encrypted,
-            "hmac": hmac,
+            "hmac": mac,
+            "mac_mode": self.integrity_mode,
             "timestamp": datetime.now().isoformat()
         }
     
@@ -325,11 +775,12 @@ class EncryptionSystem:
             # Проверка HMAC
             if original_data:
                 data_bytes = original_data.encode('utf-8') if isinstance(original_data, str) else original_data
-                expected_hmac = hashlib.pbkdf2_hmac(
-                    'sha256', data_bytes, self.hmac_key, 100000
-                ).hex()
+                # Пакеты без mac_mode созданы старой версией (PBKDF2)
+                expected_hmac = self._compute_mac(
+                    data_bytes, encrypted_package.get("mac_mode", "pbkdf2")
+                )
                 
-                if encrypted_package["hmac"] != expected_hmac:
+                if not hmac.compare_digest(encrypted_package["hmac"], expected_hmac):
                     return False, "Нарушена целостность данных"
             
             # Проверка временной метки (защита от replay-атак)
@@ -342,6 +793,10 @@ class EncryptionSystem:
         except Exception as e:
             return False, f"Ошибка проверки: {str(e)}"
     
+    def encrypt_batch(self, records):
+        """Шифрует пакет записей"""
+        return [self.encrypt_data(record) for record in records]
+    
     def decrypt_data(self, encrypted_package, expected_original=None):
         """Расшифровывает данные и проверяет целостность"""
         integrity_ok, message = self.verify_integrity(encrypted_package, expected_original)
@@ -352,12 +807,394 @@ class EncryptionSystem:
         # Для демонстрации возвращаем исходные данные
         return expected_original, "OK"
 
+class AuditPipeline:
+    """Асинхронный конвейер шифрования записей аудита.
+    
+    submit() ставит запись в ограниченную очередь и сразу возвращает id;
+    рабочие потоки шифруют записи пачками. Запечатанный пакет можно
+    получить позже через get_package(). При завершении процесса очередь
+    дошифровывается (close() зарегистрирован в atexit). Ошибка шифрования
+    пачки не останавливает рабочий поток: записи пачки считаются в
+    stats["failed"], get_package для них возвращает None.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, encryption, max_queue=10000, batch_size=64, workers=1,
+                 backpressure="block", max_sealed=100000):
+        if backpressure not in ("block", "drop", "inline"):
+            raise ValueError(f"Неизвестная политика переполнения: {backpressure}")
+        self.encryption = encryption
+        self.batch_size = batch_size
+        self.backpressure = backpressure  # block - ждать места, drop - отбросить, inline - шифровать сразу
+        self.max_sealed = max_sealed
+        
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._sealed = OrderedDict()
+        self._pending = set()  # id, принятые в очередь и еще не обработанные
+        self._sealed_ready = threading.Condition()  # защищает также _pending и stats
+        self._ids = itertools.count()
+        self._closed = False
+        self._enqueuing = 0  # submit() между проверкой _closed и постановкой в очередь
+        self.stats = {"submitted": 0, "sealed": 0, "dropped": 0, "inline": 0, "failed": 0}
+        
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"audit-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        atexit.register(self.close)
+    
+    def submit(self, record):
+        """Принимает запись аудита; возвращает её id (None, если запись отброшена)"""
+        audit_id = next(self._ids)
+        
+        # После начала close() записи в очередь не принимаются: close()
+        # дожидается уже начатых постановок, прежде чем остановить потоки
+        with self._sealed_ready:
+            self.stats["submitted"] += 1
+            closed = self._closed
+            if not closed:
+                self._pending.add(audit_id)
+                self._enqueuing += 1
+        if closed:
+            self._store([(audit_id, self.encryption.encrypt_data(record))])
+            self._count("inline")
+            return audit_id
+        
+        try:
+            if self.backpressure == "block":
+                self._queue.put((audit_id, record))
+            else:
+                self._queue.put_nowait((audit_id, record))
+        except queue.Full:
+            if self.backpressure == "drop":
+                self._discard([audit_id], "dropped")
+                return None
+            # inline: очередь переполнена - шифруем в вызывающем потоке
+            self._store([(audit_id, self.encryption.encrypt_data(record))])
+            self._count("inline")
+        finally:
+            with self._sealed_ready:
+                self._enqueuing -= 1
+                self._sealed_ready.notify_all()
+        return audit_id
+    
+    def submit_batch(self, records):
+        """Принимает пакет записей; возвращает список id"""
+        return [self.submit(record) for record in records]
+    
+    def get_package(self, audit_id, timeout=None):
+        """Возвращает зашифрованный пакет по id, ожидая его не дольше timeout.
+        
+        None - пакет не готов к timeout, не зашифрован из-за ошибки или уже
+        вытеснен из хранилища (max_sealed).
+        """
+        with self._sealed_ready:
+            self._sealed_ready.wait_for(lambda: audit_id not in self._pending, timeout)
+            return self._sealed.get(audit_id)
+    
+    def flush(self):
+        """Ждет, пока все принятые записи будут зашифрованы"""
+        self._queue.join()
+    
+    def close(self):
+        """Дошифровывает очередь и останавливает рабочие потоки"""
+        with self._sealed_ready:
+            if self._closed:
+                return
+            self._closed = True
+            self._sealed_ready.wait_for(lambda: self._enqueuing == 0)
+        atexit.unregister(self.close)
+        self.flush()
+        for _ in self._workers:
+            self._queue.put(self._STOP)
+        for worker in self._workers:
+            worker.join()
+    
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                return
+            
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            try:
+                packages = self.encryption.encrypt_batch([record for _, record in batch])
+                self._store([(audit_id, package) for (audit_id, _), package in zip(batch, packages)])
+            except Exception as error:
+                print(f"Ошибка шифрования аудита ({len(batch)} записей): {error!r}")
+                self._discard([audit_id for audit_id, _ in batch], "failed")
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+    
+    def _count(self, name, amount=1):
+        with self._sealed_ready:
+            self.stats[name] += amount
+    
+    def _discard(self, audit_ids, reason):
+        """Снимает записи без пакета (ожидающие get_package получат None)"""
+        with self._sealed_ready:
+            self._pending.difference_update(audit_ids)
+            self.stats[reason] += len(audit_ids)
+            self._sealed_ready.notify_all()
+    
+    def _store(self, sealed):
+        with self._sealed_ready:
+            for audit_id, package in sealed:
+                self._sealed[audit_id] = package
+                self._pending.discard(audit_id)
+                self.stats["sealed"] += 1
+            while len(self._sealed) > self.max_sealed:
+                self._sealed.popitem(last=False)
+            self._sealed_ready.notify_all()
+
+class SignatureEngine:
+    """Многошаблонный поиск сигнатур за один проход.
+    
+    Все шаблоны компилируются в одно регулярное выражение-префиксное дерево
+    (trie), которое проверяется в каждой позиции строки через lookahead.
+    Набор сигнатур можно заменить на лету: скомпилированное состояние
+    подменяется одним присваиванием, текущие проверки его не замечают.
+    """
+    
+    def __init__(self, signatures=()):
+        self.version = 0
+        self._compiled = None
+        self.load(signatures)
+    
+    def load(self, signatures):
+        """Компилирует новый набор сигнатур: строки или пары (id, шаблон)"""
+        order = {}
+        ids_by_text = defaultdict(list)
+        for signature in signatures:
+            sig_id, pattern = (signature, signature) if isinstance(signature, str) else signature
+            order.setdefault(sig_id, len(order))
+            ids_by_text[pattern.lower()].append(sig_id)
+        
+        texts = [text for text in ids_by_text if text]
+        trie = {}
+        for text in texts:
+            node = trie
+            for char in text:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        
+        # Для каждого шаблона - все шаблоны, являющиеся его префиксами:
+        # в одной позиции выражение находит только самое длинное совпадение
+        prefixes = {}
+        for text in texts:
+            node = trie
+            prefixes[text] = []
+            for length, char in enumerate(text, 1):
+                node = node[char]
+                if "" in node:
+                    prefixes[text].append(text[:length])
+        
+        body = self._build_trie_regex(trie) if texts else "(?!)"
+        matcher = re.compile(f"(?=({body}))")
+        
+        self._compiled = (matcher, ids_by_text, prefixes, order)
+        self.version += 1
+    
+    def scan(self, text):
+        """Возвращает id сигнатур, найденных в тексте (в порядке загрузки)"""
+        matcher, ids_by_text, prefixes, order = self._compiled
+        found = set()
+        for match in set(matcher.findall(text.lower())):
+            found.update(prefixes[match])
+        if not found:
+            return []
+        ids = {sig_id for match in found for sig_id in ids_by_text[match]}
+        return sorted(ids, key=order.__getitem__)
+    
+    def _build_trie_regex(self, trie):
+        def build(node):
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+            # Шаблон может закончиться в этом узле - продолжение необязательно
+            return f"(?:{body})?" if "" in node else body
+        
+        return build(trie)
+
+class IPReputationIndex:
+    """Индекс репутации IP-сетей с поиском по наибольшему префиксу.
+    
+    CIDR-префиксы разворачиваются в отсортированные непересекающиеся
+    диапазоны адресов, каждому из которых соответствует метка самого
+    специфичного покрывающего префикса. Поиск - bisect по списку начал
+    диапазонов; концы IPv4-диапазонов хранятся в компактном array.
+    Каталог по старшим 16 битам адреса сужает bisect до диапазонов
+    одного блока /16: на сотнях тысяч префиксов полный bisect упирается
+    в промахи кэша, а не в число сравнений.
+    """
+    
+    _FAMILIES = {4: (socket.AF_INET, 32), 6: (socket.AF_INET6, 128)}
+    DIRECTORY_BITS = 16
+    
+    def __init__(self, entries=()):
+        self.invalid_entries = 0
+        self.prefix_count = 0
+        self._tables = {}
+        self.load(entries)
+    
+    def load(self, entries):
+        """Полностью перестраивает индекс из пар (cidr, метка)"""
+        prefixes = {4: [], 6: []}
+        labels = {}
+        self.invalid_entries = 0
+        for cidr, label in entries:
+            parsed = self._parse_cidr(cidr)
+            if parsed is None:
+                self.invalid_entries += 1
+                continue
+            version, start, end = parsed
+            label = labels.setdefault(label, label)  # одна копия строки на метку
+            prefixes[version].append((start, end, label))
+        
+        self.prefix_count = len(prefixes[4]) + len(prefixes[6])
+        tables = {
+            4: self._build_table(4, prefixes[4], array("I")),
+            6: self._build_table(6, prefixes[6], [])
+        }
+        self._tables = tables  # атомарная подмена для параллельных lookup
+    
+    def load_file(self, path):
+        """Загружает файл со строками "cidr метка" (или "cidr,метка"), # - комментарии"""
+        def entries():
+            with open(path, encoding="utf-8") as source:
+                for line in source:
+                    line = line.split("#", 1)[0].strip()
+                    if not line:
+                        continue
+                    parts = line.replace(",", " ").split(None, 1)
+                    yield parts[0], parts[1].strip() if len(parts) > 1 else "blocklist"
+        self.load(entries())
+    
+    def lookup(self, ip_address):
+        """Возвращает метку наиболее специфичного префикса или None"""
+        try:
+            if ":" in ip_address:
+                version = 6
+                value = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip_address), "big")
+            else:
+                version = 4
+                value = int.from_bytes(socket.inet_pton(socket.AF_INET, ip_address), "big")
+        except (OSError, TypeError):
+            return None
+        
+        starts, ends, labels, directory, shift = self._tables[version]
+        block = value >> shift
+        index = bisect.bisect_right(starts, value, directory[block], directory[block + 1]) - 1
+        if index >= 0 and value <= ends[index]:
+            return labels[index]
+        return None
+    
+    def __len__(self):
+        return self.prefix_count
+    
+    def _parse_cidr(self, cidr):
+        """Разбирает "адрес/длина" в (версия, первый адрес, последний адрес)"""
+        address, _, length = cidr.strip().partition("/")
+        version = 6 if ":" in address else 4
+        family, bits = self._FAMILIES[version]
+        try:
+            value = int.from_bytes(socket.inet_pton(family, address), "big")
+            length = int(length) if length else bits
+        except (OSError, ValueError):
+            return None
+        if not 0 <= length <= bits:
+            return None
+        host_mask = (1 << (bits - length)) - 1
+        start = value & ~host_mask
+        return version, start, start | host_mask
+    
+    def _build_table(self, version, prefixes, ends):
+        """Таблица (начала, концы, метки, каталог, сдвиг) одного семейства.
+        
+        directory[block] - индекс первого диапазона, начинающегося в блоке
+        block или позже; искомый диапазон лежит в [directory[block] - 1,
+        directory[block + 1]), поэтому bisect ограничивается этим окном.
+        """
+        starts, ends, labels = self._flatten(prefixes, [], ends)
+        shift = self._FAMILIES[version][1] - self.DIRECTORY_BITS
+        directory = array("I", (
+            bisect.bisect_left(starts, block << shift)
+            for block in range((1 << self.DIRECTORY_BITS) + 1)
+        ))
+        return starts, ends, labels, directory, shift
+    
+    def _flatten(self, prefixes, starts, ends):
+        """Превращает вложенные префиксы в непересекающиеся диапазоны"""
+        labels = []
+        
+        def emit(low, high, label):
+            if low > high:
+                return
+            # Соседние диапазоны с одной меткой склеиваются
+            if labels and labels[-1] is label and ends[-1] + 1 == low:
+                ends[-1] = high
+                return
+            starts.append(low)
+            ends.append(high)
+            labels.append(label)
+        
+        # Внешние префиксы раньше вложенных; при равенстве побеждает последний
+        prefixes.sort(key=lambda prefix: (prefix[0], -prefix[1]))
+        open_prefixes = []  # стек (конец, метка) объемлющих префиксов
+        position = 0
+        for start, end, label in prefixes:
+            while open_prefixes and open_prefixes[-1][0] < start:
+                top_end, top_label = open_prefixes.pop()
+                emit(position, top_end, top_label)
+                position = max(position, top_end + 1)
+            if open_prefixes:
+                emit(position, start - 1, open_prefixes[-1][1])
+            position = start
+            open_prefixes.append((end, label))
+        while open_prefixes:
+            top_end, top_label = open_prefixes.pop()
+            emit(position, top_end, top_label)
+            position = max(position, top_end + 1)
+        
+        return starts, ends, labels
+
 class ThreatIntelligence:
     """Система анализа и классификации угроз"""
     
     def __init__(self):
         self.threat_database = self._load_threat_database()
         self.behavioral_patterns = {}
+        self.ip_reputation = IPReputationIndex(self.threat_database["ip_reputation"].items())
+        self.pattern_engine = SignatureEngine(self.threat_database["malicious_patterns"])
+        self.user_agent_engine = SignatureEngine(self.threat_database["suspicious_user_agents"])
+    
+    def reload_signatures(self, malicious_patterns=None, suspicious_user_agents=None):
+        """Горячая замена наборов сигнатур без остановки обработки запросов"""
+        if malicious_patterns is not None:
+            self.threat_database["malicious_patterns"] = list(malicious_patterns)
+            self.pattern_engine.load(self.threat_database["malicious_patterns"])
+        if suspicious_user_agents is not None:
+            self.threat_database["suspicious_user_agents"] = list(suspicious_user_agents)
+            self.user_agent_engine.load(self.threat_database["suspicious_user_agents"])
         
     def _load_threat_database(self):
         """Загружает базу известных угроз"""
@@ -375,6 +1212,10 @@ class ThreatIntelligence:
             ],
             "suspicious_user_agents": [
                 "nikto", "sqlmap", "metasploit", "nmap"
+            ],
+            # Инструменты эксплуатации: запросы отклоняются до любых проверок
+            "blocked_user_agents": [
+                "sqlmap", "metasploit"
             ]
         }
     
@@ -383,23 +1224,23 @@ class ThreatIntelligence:
         threat_score = 0
         detected_threats = []
         
-        # Проверка репутации IP
-        ip_threat = self.threat_database["ip_reputation"].get(ip_address)
+        # Проверка репутации IP (наибольший совпадающий CIDR-префикс)
+        ip_threat = self.ip_reputation.lookup(ip_address)
         if ip_threat:
             threat_score += 30
             detected_threats.append(f"IP с плохой репутацией: {ip_threat}")
         
         # Анализ User-Agent
-        if any(agent in user_agent.lower() for agent in self.threat_database["suspicious_user_agents"]):
+        agent_matches = self.user_agent_engine.scan(user_agent)
+        if agent_matches:
             threat_score += 25
             detected_threats.append("Обнаружен сканер уязвимостей")
         
-        # Поиск вредоносных паттернов в данных
-        request_str = str(request_data).lower()
-        for pattern in self.threat_database["malicious_patterns"]:
-            if pattern in request_str:
-                threat_score += 40
-                detected_threats.append(f"Обнаружен {pattern}")
+        # Поиск вредоносных паттернов в данных (один проход по строке)
+        pattern_matches = self.pattern_engine.scan(str(request_data))
+        for pattern in pattern_matches:
+            threat_score += 40
+            detected_threats.append(f"Обнаружен {pattern}")
         
         # Определение уровня угрозы
         if threat_score >= 70:
@@ -415,9 +1256,25 @@ class ThreatIntelligence:
             "threat_level": threat_level,
             "threat_score": threat_score,
             "detected_threats": detected_threats,
+            "matched_signatures": agent_matches + pattern_matches,
             "recommendation": self._get_recommendation(threat_level)
         }
     
+    def analyze_batch(self, requests):
+        """Анализирует пакет [(ip, user_agent, данные), ...].
+        
+        Анализ зависит только от входных данных, поэтому одинаковые
+        запросы пакета (типично для флуда) оцениваются один раз.
+        """
+        cache = {}
+        results = []
+        for ip_address, user_agent, request_data in requests:
+            key = (ip_address, user_agent, str(request_data))
+            if key not in cache:
+                cache[key] = self.analyze_request(ip_address, user_agent, request_data)
+            results.append(cache[key])
+        return results
+    
     def _get_recommendation(self, threat_level):
         """Возвращает рекомендации по обработке угрозы"""
         recommendations = {
@@ -428,13 +1285,48 @@ class ThreatIntelligence:
         }
         return recommendations.get(threat_level, "Неизвестный уровень угрозы")
 
+class SecurityEventStore:
+    """Скользящие счетчики правил оповещений.
+    
+    Окно правила делится на slots интервалов, и для каждого хранится
+    только число событий, поэтому память не растет при потоке событий, а
+    проверка правила стоит O(1) на событие. Граница окна точна до
+    window / slots секунд. Сами события хранит SecurityMonitor
+    (последние 1000) и SecurityEventLog.
+    """
+    
+    def __init__(self, slots=10):
+        self.slots = slots
+        self._rule_windows = {}  # правило -> [deque([интервал, число]), сумма]
+    
+    def count_in_window(self, rule_name, epoch, window, matched):
+        """Скользящий счетчик правила: учитывает событие (если matched) и
+        возвращает число подходящих событий за последние window секунд"""
+        state = self._rule_windows.get(rule_name)
+        if state is None:
+            state = self._rule_windows[rule_name] = [deque(), 0]
+        intervals = state[0]
+        interval = int(epoch // (window / self.slots))
+        if matched:
+            if intervals and intervals[-1][0] >= interval:
+                intervals[-1][1] += 1
+            else:
+                intervals.append([interval, 1])
+            state[1] += 1
+        while intervals and intervals[0][0] <= interval - self.slots:
+            state[1] -= intervals.popleft()[1]
+        return state[1]
+
 class SecurityMonitor:
     """Мониторинг безопасности и реагирование на инциденты"""
     
-    def __init__(self):
+    def __init__(self, event_log=None):
         self.security_events = deque(maxlen=1000)
+        self.event_store = SecurityEventStore()
+        self.event_log = event_log  # SecurityEventLog для долговременного хранения
         self.alert_rules = self._load_alert_rules()
-        self.incident_counter = 0
+        # Продолжаем нумерацию событий уже существующего журнала
+        self.incident_counter = event_log.next_id if event_log is not None else 0
         
     def _load_alert_rules(self):
         """Загружает правила генерации оповещений"""
@@ -442,25 +1334,37 @@ class SecurityMonitor:
             "multiple_failures": {
                 "threshold": 5,
                 "time_window": 60,
-                "severity": "high"
+                "severity": "high",
+                "event_types": ["authentication_failure"],
+                "alert_type": "multiple_authentication_failures",
+                "message": "Обнаружено {count} неудачных попыток входа за {window} секунд"
             },
             "ddos_detected": {
-                "threshold": 1, 
-                "time_window": 1,
-                "severity": "critical"
+                "threshold": 5,
+                "time_window": 10,
+                "severity": "critical",
+                "event_types": ["ddos_protection_block"],
+                "event_severities": ["critical"],  # только новые обнаруженные атаки
+                "alert_type": "ddos_attack_detected",
+                "message": "Обнаружена DDoS-атака: {count} блокировок за {window} секунд"
             },
             "suspicious_activity": {
                 "threshold": 3,
                 "time_window": 300,
-                "severity": "medium"
+                "severity": "medium",
+                "event_types": ["threat_detected"],
+                "alert_type": "suspicious_activity",
+                "message": "Обнаружено {count} подозрительных запросов за {window} секунд"
             }
         }
     
     def log_security_event(self, event_type, details, severity="low"):
         """Логирует событие безопасности"""
+        epoch = time.time()
         event = {
             "id": self.incident_counter,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": datetime.fromtimestamp(epoch).isoformat(),
+            "epoch": epoch,
             "type": event_type,
             "details": details,
             "severity": severity,
@@ -469,31 +1373,40 @@ class SecurityMonitor:
         }
         
         self.security_events.append(event)
+        if self.event_log is not None:
+            self.event_log.append(event)
         self.incident_counter += 1
         
         # Проверка правил оповещений
-        alert = self._check_alert_rules(event_type, severity)
+        alert = self._check_alert_rules(event)
         if alert:
             self._trigger_alert(alert, event)
         
         return event["id"]
     
-    def _check_alert_rules(self, event_type, severity):
-        """Проверяет правила генерации оповещений"""
-        if event_type == "authentication_failure":
-            recent_failures = [
-                event for event in self.security_events 
-                if event["type"] == "authentication_failure" 
-                and datetime.now() - datetime.fromisoformat(event["timestamp"]) < timedelta(seconds=60)
-            ]
-            if len(recent_failures) >= self.alert_rules["multiple_failures"]["threshold"]:
-                return {
-                    "type": "multiple_authentication_failures",
-                    "severity": "high",
-                    "message": f"Обнаружено {len(recent_failures)} неудачных попыток входа за 60 секунд"
+    def log_security_events(self, events):
+        """Логирует пакет событий [(тип, детали, серьезность), ...]"""
+        return [self.log_security_event(*event) for event in events]
+    
+    def _check_alert_rules(self, event):
+        """Проверяет правила генерации оповещений по скользящим счетчикам"""
+        alert = None
+        for rule_name, rule in self.alert_rules.items():
+            if event["type"] not in rule["event_types"]:
+                continue
+            severities = rule.get("event_severities")
+            matched = severities is None or event["severity"] in severities
+            count = self.event_store.count_in_window(
+                rule_name, event["epoch"], rule["time_window"], matched
+            )
+            if matched and alert is None and count >= rule["threshold"]:
+                alert = {
+                    "type": rule["alert_type"],
+                    "severity": rule["severity"],
+                    "message": rule["message"].format(count=count, window=rule["time_window"])
                 }
         
-        return None
+        return alert
     
     def _trigger_alert(self, alert, event):
         """Активирует оповещение безопасности"""
@@ -511,30 +1424,108 @@ class SecurityMonitor:
         }
         return responses.get(severity, "Неизвестный уровень серьезности")
     
-    def get_security_report(self):
-        """Генерирует отчет о безопасности"""
+    def get_security_report(self, start=None, end=None):
+        """Генерирует отчет о безопасности.
+        
+        С журналом на диске статистика считается по всей сохраненной
+        истории (или по интервалу start..end в epoch), иначе - по
+        последним 50 событиям в памяти.
+        """
         recent_events = list(self.security_events)[-50:]  # Последние 50 событий
         
-        severity_counts = defaultdict(int)
-        for event in recent_events:
-            severity_counts[event["severity"]] += 1
+        if self.event_log is not None:
+            summary = self.event_log.summary(start, end)
+        else:
+            severity_counts = defaultdict(int)
+            for event in recent_events:
+                severity_counts[event["severity"]] += 1
+            summary = {
+                "total_events": len(recent_events),
+                "severity_distribution": dict(severity_counts)
+            }
         
         return {
-            "total_events": len(recent_events),
-            "severity_distribution": dict(severity_counts),
+            "total_events": summary["total_events"],
+            "severity_distribution": summary["severity_distribution"],
             "recent_incidents": recent_events[-10:],  # Последние 10 инцидентов
             "report_time": datetime.now().isoformat()
         }
 
+class RequestPrefilter:
+    """Ранний отсев заведомо враждебных запросов.
+    
+    Проверки от дешевых к дорогим: заблокированный IP, отозванный токен
+    (поиск в словаре/множестве), затем скомпилированный denylist
+    User-Agent. Отклоненный запрос не попадает в историю DDoS, анализ
+    угроз и монитор: вместо события на каждый запрос увеличивается
+    счетчик rejected[причина].
+    """
+    
+    RESPONSES = {
+        "blocked_ip": {
+            "authenticated": False,
+            "message": "IP временно заблокирован за подозрительную активность",
+            "threat_level": "high"
+        },
+        "revoked_token": {
+            "authenticated": False,
+            "message": "Токен отозван",
+            "threat_level": "medium"
+        },
+        "blocked_user_agent": {
+            "authenticated": False,
+            "message": "Клиент в списке запрещенных",
+            "threat_level": "high"
+        }
+    }
+    
+    def __init__(self, ddos_protection, authentication, blocked_user_agents=()):
+        self.ddos_protection = ddos_protection
+        self.authentication = authentication
+        self.rejected = defaultdict(int)
+        self._agent_matcher = None
+        self.load_user_agents(blocked_user_agents)
+    
+    def load_user_agents(self, blocked_user_agents):
+        """Компилирует denylist User-Agent (подстроки без учета регистра)"""
+        agents = [agent for agent in blocked_user_agents if agent]
+        self._agent_matcher = (
+            re.compile("|".join(re.escape(agent) for agent in agents), re.IGNORECASE) if agents else None
+        )
+    
+    def check(self, ip_address, token, user_agent, current_time):
+        """Возвращает результат отказа либо None, если запрос идет дальше"""
+        if self.ddos_protection.is_blocked(ip_address, current_time):
+            reason = "blocked_ip"
+        elif token in self.authentication.revoked_tokens:
+            reason = "revoked_token"
+        elif self._agent_matcher is not None and self._agent_matcher.search(user_agent):
+            reason = "blocked_user_agent"
+        else:
+            return None
+        self.rejected[reason] += 1
+        return dict(self.RESPONSES[reason])
+
 class CyberSecuritySystem:
     """ГЛАВНАЯ СИСТЕМА КИБЕРБЕЗОПАСНОСТИ - интегрирует все компоненты"""
     
-    def __init__(self):
-        self.ddos_protection = DDoSProtection()
-        self.authentication = AuthenticationSystem()
+    def __init__(self, async_audit=True, event_log_path=None, shared_limits=None, flood_sketch=None,
+                 prefilter=True, jwt_secret=None):
+        self.ddos_protection = DDoSProtection(shared_limits, flood_sketch)
+        # Системы с общим jwt_secret принимают токены друг друга
+        self.authentication = AuthenticationSystem(jwt_secret=jwt_secret)
         self.encryption = EncryptionSystem()
         self.threat_intel = ThreatIntelligence()
-        self.monitor = SecurityMonitor()
+        # Ранний отсев заблокированных IP, отозванных токенов и запрещенных клиентов
+        self.prefilter = RequestPrefilter(
+            self.ddos_protection, self.authentication,
+            self.threat_intel.threat_database["blocked_user_agents"]
+        ) if prefilter else None
+        # Журнал событий на диске подключается, если задан каталог
+        event_log = SecurityEventLog(event_log_path) if event_log_path else None
+        self.monitor = SecurityMonitor(event_log)
+        # При async_audit шифрование аудита выполняется вне пути запроса
+        self.audit_pipeline = AuditPipeline(self.encryption) if async_audit else None
         
         print("Система кибербезопасности инициализирована")
         print("Компоненты: DDoS защита, Аутентификация, Шифрование, Мониторинг")
@@ -542,10 +1533,124 @@ class CyberSecuritySystem:
     def authenticate_request(self, ip_address, token, command, user_agent="", required_permission=None):
         """Полный цикл аутентификации и проверки безопасности"""
         
+        # 0. Ранний отсев: без записи в историю DDoS и события монитора
+        if self.prefilter is not None:
+            rejection = self.prefilter.check(ip_address, token, user_agent, time.time())
+            if rejection is not None:
+                return rejection
+        
         # 1. Проверка DDoS и базовой безопасности
         ddos_check = self.ddos_protection.check_request(ip_address, command, user_agent)
+        
+        result, event, audit_data = self._process_request(
+            ip_address, token, command, user_agent, required_permission, ddos_check,
+            lambda: self.threat_intel.analyze_request(ip_address, user_agent, command)
+        )
+        
+        # 4. Шифрование лога для аудита
+        if audit_data is not None:
+            if self.audit_pipeline is not None:
+                result["audit_id"] = self.audit_pipeline.submit(audit_data)
+            else:
+                result["encrypted_audit"] = self.encryption.encrypt_data(audit_data)
+        
+        # 5. Логирование события
+        self.monitor.log_security_event(*event)
+        return result
+    
+    def authenticate_batch(self, requests, current_time=None):
+        """Пакетная аутентификация: результаты совпадают с authenticate_request.
+        
+        requests - список словарей с полями authenticate_request либо
+        колоночный блок {поле: [значения]}; current_time - время пакета
+        (epoch) для DDoS-защиты, по умолчанию time.time(). Очистка DDoS-истории и чтение
+        часов выполняются один раз на пакет, одинаковые запросы оцениваются
+        анализатором угроз один раз, шифрование аудита и запись событий
+        выполняются одним шагом после обработки всего пакета.
+        
+        С ранним отсевом запросы проходят все шаги строго по одному в
+        исходном порядке: вердикт отсева зависит от блокировок и отзывов,
+        сделанных предыдущими запросами пакета.
+        """
+        rows = self._normalize_batch(requests)
+        if current_time is None:
+            current_time = time.time()
+        
+        threat_cache = {}
+        def analyze_threats(row):
+            key = (row["ip_address"], row["user_agent"], str(row["command"]))
+            if key not in threat_cache:
+                threat_cache[key] = self.threat_intel.analyze_request(
+                    row["ip_address"], row["user_agent"], row["command"]
+                )
+            return threat_cache[key]
+        
+        # 1. Без отсева - проверка DDoS по всему пакету сразу
+        if self.prefilter is None:
+            ddos_checks = self.ddos_protection.check_batch(
+                [(row["ip_address"], row["command"], row["user_agent"]) for row in rows], current_time
+            )
+        
+        # 0-3. Отсев, DDoS, анализ угроз и аутентификация в исходном порядке
+        results = []
+        events = []
+        audits = []
+        for i, row in enumerate(rows):
+            if self.prefilter is not None:
+                rejection = self.prefilter.check(row["ip_address"], row["token"], row["user_agent"], current_time)
+                if rejection is not None:
+                    results.append(rejection)
+                    continue
+                ddos_check = self.ddos_protection.check_batch(
+                    [(row["ip_address"], row["command"], row["user_agent"])], current_time
+                )[0]
+            else:
+                ddos_check = ddos_checks[i]
+            result, event, audit_data = self._process_request(
+                row["ip_address"], row["token"], row["command"], row["user_agent"],
+                row["required_permission"], ddos_check, lambda row=row: analyze_threats(row)
+            )
+            results.append(result)
+            events.append(event)
+            if audit_data is not None:
+                audits.append((result, audit_data))
+        
+        # 4-5. Отложенные шифрование аудита и запись событий
+        records = [audit_data for _, audit_data in audits]
+        if self.audit_pipeline is not None:
+            for (result, _), audit_id in zip(audits, self.audit_pipeline.submit_batch(records)):
+                result["audit_id"] = audit_id
+        else:
+            for (result, _), package in zip(audits, self.encryption.encrypt_batch(records)):
+                result["encrypted_audit"] = package
+        self.monitor.log_security_events(events)
+        
+        return results
+    
+    def _normalize_batch(self, requests):
+        """Приводит пакет к списку словарей с полным набором полей"""
+        if isinstance(requests, dict):
+            columns = list(requests.keys())
+            requests = [dict(zip(columns, values)) for values in zip(*requests.values())]
+        return [
+            {
+                "ip_address": request["ip_address"],
+                "token": request["token"],
+                "command": request["command"],
+                "user_agent": request.get("user_agent", ""),
+                "required_permission": request.get("required_permission")
+            }
+            for request in requests
+        ]
+    
+    def _process_request(self, ip_address, token, command, user_agent, required_permission,
+                         ddos_check, analyze_threats):
+        """Шаги 1-3 цикла аутентификации после проверки DDoS.
+        
+        Возвращает (результат, событие для монитора, данные аудита или None).
+        """
         if not ddos_check["allowed"]:
-            self.monitor.log_security_event(
+            event = (
                 "ddos_protection_block",
                 {
                     "ip_address": ip_address,
@@ -559,12 +1664,12 @@ class CyberSecuritySystem:
                 "authenticated": False,
                 "message": ddos_check["message"],
                 "threat_level": ddos_check["threat_level"]
-            }
+            }, event, None
         
         # 2. Анализ угроз
-        threat_analysis = self.threat_intel.analyze_request(ip_address, user_agent, command)
+        threat_analysis = analyze_threats()
         if threat_analysis["threat_level"] in ["high", "critical"]:
-            self.monitor.log_security_event(
+            event = (
                 "threat_detected",
                 {
                     "ip_address": ip_address,
@@ -578,12 +1683,12 @@ class CyberSecuritySystem:
                 "authenticated": False,
                 "message": f"Обнаружены угрозы: {', '.join(threat_analysis['detected_threats'])}",
                 "threat_level": threat_analysis["threat_level"]
-            }
+            }, event, None
         
         # 3. Аутентификация
         auth_check = self.authentication.verify_token(token, required_permission)
         if not auth_check["valid"]:
-            self.monitor.log_security_event(
+            event = (
                 "authentication_failure",
                 {
                     "ip_address": ip_address,
@@ -597,9 +1702,8 @@ class CyberSecuritySystem:
                 "authenticated": False,
                 "message": auth_check["reason"],
                 "threat_level": auth_check.get("threat_level", "medium")
-            }
+            }, event, None
         
-        # 4. Шифрование лога для аудита
         audit_data = {
             "ip": ip_address,
             "user": auth_check["username"],
@@ -607,10 +1711,7 @@ class CyberSecuritySystem:
             "timestamp": datetime.now().isoformat(),
             "threat_analysis": threat_analysis
         }
-        encrypted_audit = self.encryption.encrypt_data(audit_data)
-        
-        # 5. Логирование успешного доступа
-        self.monitor.log_security_event(
+        event = (
             "successful_access",
             {
                 "ip_address": ip_address,
@@ -621,16 +1722,28 @@ class CyberSecuritySystem:
             },
             "low"
         )
-        
         return {
             "authenticated": True,
             "message": "Доступ разрешен",
             "username": auth_check["username"],
             "role": auth_check["role"],
             "permissions": auth_check["permissions"],
-            "encrypted_audit": encrypted_audit,
+            "encrypted_audit": None,
             "threat_level": "low"
-        }
+        }, event, audit_data
+    
+    def get_audit_package(self, audit_id, timeout=None):
+        """Возвращает зашифрованную запись аудита по id из результата аутентификации"""
+        if self.audit_pipeline is None:
+            return None
+        return self.audit_pipeline.get_package(audit_id, timeout)
+    
+    def shutdown(self):
+        """Дошифровывает очередь аудита и закрывает журнал событий перед остановкой"""
+        if self.audit_pipeline is not None:
+            self.audit_pipeline.close()
+        if self.monitor.event_log is not None:
+            self.monitor.event_log.close()
     
     def get_security_status(self):
         """Возвращает текущий статус безопасности"""
@@ -643,14 +1756,20 @@ class CyberSecuritySystem:
                 "active_tokens": len(self.authentication.authorized_tokens),
                 "revoked_tokens": len(self.authentication.revoked_tokens)
             },
+            "prefilter": dict(self.prefilter.rejected) if self.prefilter else None,
+            "audit": dict(self.audit_pipeline.stats) if self.audit_pipeline else None,
             "monitoring": self.monitor.get_security_report()
         }
 # ... остальной код cybersecurity.py ...
 
 class SimulatedAttacks:
-    """Генератор искусственных кибератак для тестирования системы"""
+    """Генератор искусственных кибератак для тестирования системы.
     
-    def __init__(self):
+    seed делает последовательность атак воспроизводимой (нагрузочные тесты).
+    """
+    
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
         self.attack_scenarios = {
             "ddos_flood": {
                 "name": "DDoS флуд-атака",
@@ -678,8 +1797,9 @@ class SimulatedAttacks:
     
     def generate_attack(self, chance=0.3):
         """С вероятностью chance запускает случайную атаку"""
-        if random.random() < chance and not self.attack_active:
-            attack_type = random.choice(list(self.attack_scenarios.keys()))
+        if self.rng.random() < chance and not self.attack_active:
+            attack_types = list(self.attack_scenarios.keys())
+            attack_type = attack_types[self.rng.integers(len(attack_types))]
             self.current_attack = self.attack_scenarios[attack_type]
             self.attack_active = True
             return self._execute_attack(attack_type)
@@ -697,17 +1817,18 @@ class SimulatedAttacks:
             return self._simulate_sql_injection(scenario)
     
     def _simulate_ddos(self, scenario):
-        attack_requests = []
-        base_ip = random.choice(scenario["ip_range"])
+        base_ip = scenario["ip_range"][self.rng.integers(len(scenario["ip_range"]))]
+        hosts = self.rng.integers(1, 256, scenario["requests_per_second"])
         
-        for i in range(scenario["requests_per_second"]):
-            ip = base_ip.format(random.randint(1, 255))
-            attack_requests.append({
-                "ip_address": ip,
+        attack_requests = [
+            {
+                "ip_address": base_ip.format(host),
                 "command": "system_status",
                 "user_agent": "Mozilla/5.0 (compatible; Botnet)",
                 "token": "invalid"
-            })
+            }
+            for host in hosts.tolist()
+        ]
         
         return {
             "type": "ddos_flood",
@@ -719,16 +1840,19 @@ class SimulatedAttacks:
     
     def _simulate_brute_force(self, scenario):
         """Имитирует подбор учетных данных"""
-        attempts = []
-        base_token = random.choice(scenario["fake_tokens"])
+        base_token = scenario["fake_tokens"][self.rng.integers(len(scenario["fake_tokens"]))]
+        hosts = self.rng.integers(100, 201, scenario["attempts_per_minute"])
+        suffixes = self.rng.integers(1000, 10000, scenario["attempts_per_minute"])
         
-        for i in range(scenario["attempts_per_minute"]):
-            attempts.append({
-                "ip_address": f"192.168.1.{random.randint(100, 200)}",
+        attempts = [
+            {
+                "ip_address": f"192.168.1.{host}",
                 "command": "traffic_control",
                 "user_agent": "Mozilla/5.0",
-                "token": base_token + str(random.randint(1000, 9999))
-            })
+                "token": base_token + str(suffix)
+            }
+            for host, suffix in zip(hosts.tolist(), suffixes.tolist())
+        ]
         
         return {
             "type": "brute_force", 
@@ -739,15 +1863,15 @@ class SimulatedAttacks:
     
     def _simulate_sql_injection(self, scenario):
         """Имитирует SQL инъекцию"""
-        pattern = random.choice(scenario["patterns"])
-        command = random.choice(scenario["target_commands"])
+        pattern = scenario["patterns"][self.rng.integers(len(scenario["patterns"]))]
+        command = scenario["target_commands"][self.rng.integers(len(scenario["target_commands"]))]
         
         return {
             "type": "sql_injection",
             "name": scenario["name"],
             "description": scenario["description"],
             "attack_data": {
-                "ip_address": f"10.0.1.{random.randint(50, 150)}",
+                "ip_address": f"10.0.1.{self.rng.integers(50, 151)}",
                 "command": f"{command}{pattern}",
                 "user_agent": "Mozilla/5.0 (HackTool)",
                 "token": "admin' OR '1'='1"
@@ -0,0 +1,264 @@
+# district_controller.py
+"""
+УПРАВЛЕНИЕ РАЙОНОМ ПЕРЕКРЕСТКОВ
+Тысячи перекрестков в одном процессе: состояние хранится структурой
+массивов, решения для всех перекрестков принимаются за один векторный
+проход, район делится на шарды по рабочим процессам.
+"""
+import copy
+import time
+import multiprocessing
+import numpy as np
+
+from neural_network import (
+    DEFAULT_TRAFFIC_WEIGHTS, PEDESTRIAN_TYPES, VEHICLE_TYPES, DIRECTIONS, POSTURES,
+    VEHICLE_SIGNALS, WEATHER_CONDITIONS, VehicleSpatialIndex
+)
+from traffic_kernels import collision_times
+
+# Решения make_decision; в состоянии района хранится индекс в кортеже
+DECISIONS = (
+    "КРАСНЫЙ ДЛЯ ВСЕХ НАПРАВЛЕНИЙ",
+    "ЖЕЛТЫЙ МИГАЮЩИЙ + ПРЕДУПРЕЖДЕНИЕ",
+    " ПРИОРИТЕТ СПЕШАЩЕМУ ПЕШЕХОДУ",
+    "ПРИОРИТЕТ СПЕЦТРАНСПОРТУ",
+    "ЗЕЛЕНЫЙ ДЛЯ ПЕШЕХОДОВ",
+    "ЗЕЛЕНЫЙ ДЛЯ МАШИН"
+)
+# Решения, после которых пешеходам горит красный ("ПЕШЕХОД" в тексте решения)
+PEDESTRIAN_RED_DECISIONS = [i for i, decision in enumerate(DECISIONS) if "ПЕШЕХОД" in decision]
+
+VEHICLE_INDEX_DTYPE = np.dtype([("x", "f8"), ("distance_to_crosswalk", "f8")])
+
+
+class IntersectionBatch:
+    """Состояние многих перекрестков (AdvancedTrafficAI) структурой массивов.
+
+    Каждый перекресток - num_cameras камер; кадры всех камер генерируются
+    и анализируются вместе, правила совпадают с make_decision.
+    """
+
+    def __init__(self, size, num_cameras=4, weights=None, seed=None,
+                 max_pedestrians=8, max_vehicles=10):
+        self.size = size
+        self.num_cameras = num_cameras
+        self.max_pedestrians = max_pedestrians
+        self.max_vehicles = max_vehicles
+        self.weights = copy.deepcopy(weights or DEFAULT_TRAFFIC_WEIGHTS)
+        self.rng = np.random.default_rng(seed)
+
+        # Состояние перекрестков
+        self.pedestrians_red = np.zeros(size, dtype=bool)  # "красный_пешеходам"
+        self.emergency_active = np.zeros(size, dtype=bool)
+        self.urgent_counts = np.zeros((size, num_cameras, max_pedestrians), dtype=np.int32)
+        self.decisions = np.full(size, DECISIONS.index("ЗЕЛЕНЫЙ ДЛЯ МАШИН"), dtype=np.int8)
+        self.durations = np.zeros(size, dtype=np.int16)
+        self.ticks = 0
+
+        self._priority_table = np.array([
+            self.weights["pedestrian_priority_weights"].get(ped_type, 0.5) for ped_type in PEDESTRIAN_TYPES
+        ])
+        self._emergency_table = np.array([
+            self.weights["emergency_levels"][signal] for signal in VEHICLE_SIGNALS
+        ])
+
+    def step(self):
+        """Один такт: съемка всех камер и решения для всех перекрестков"""
+        return self.decide(self.simulate())
+
+    def simulate(self):
+        """Генерирует кадры всех камер района (плоские массивы объектов)"""
+        rng = self.rng
+        groups = self.size * self.num_cameras  # группа = (перекресток, камера)
+
+        ped_counts = rng.integers(0, self.max_pedestrians + 1, groups)
+        veh_counts = rng.integers(0, self.max_vehicles + 1, groups)
+        num_peds = int(ped_counts.sum())
+        num_vehicles = int(veh_counts.sum())
+        ped_group = np.repeat(np.arange(groups), ped_counts)
+        ped_slot = np.arange(num_peds) - np.repeat(np.cumsum(ped_counts) - ped_counts, ped_counts)
+
+        tick = {
+            "ped_counts": ped_counts,
+            "veh_counts": veh_counts,
+            "ped_group": ped_group,
+            "ped_type": rng.integers(0, len(PEDESTRIAN_TYPES), num_peds),
+            "ped_x": rng.uniform(0, 100, num_peds),
+            "ped_speed": rng.uniform(0.1, 2.5, num_peds),
+            "direction": rng.integers(0, len(DIRECTIONS), num_peds),
+            "posture": rng.integers(0, len(POSTURES), num_peds),
+            "veh_group": np.repeat(np.arange(groups), veh_counts),
+            "veh_type": rng.integers(0, len(VEHICLE_TYPES), num_vehicles),
+            "veh_x": rng.uniform(0, 100, num_vehicles),
+            "veh_speed": rng.uniform(0, 80, num_vehicles),
+            "signal": rng.integers(0, len(VEHICLE_SIGNALS), num_vehicles),
+            "veh_distance": rng.uniform(5, 100, num_vehicles),
+            "weather": rng.integers(0, len(WEATHER_CONDITIONS), groups)
+        }
+
+        # Анализ поведения (правила detect_urgent_behavior / detect_dangerous_behavior)
+        speed = tick["ped_speed"]
+        to_crosswalk = tick["direction"] == DIRECTIONS.index("к_переходу")
+        urgency_signals = (
+            2 * (speed > 2.0)
+            + 3 * (tick["posture"] == POSTURES.index("бежит"))
+            + 2 * (to_crosswalk & (speed > 1.0))
+            + (rng.random(num_peds) > 0.9)
+        )
+        danger_signals = (
+            3 * (to_crosswalk & (speed > 1.2) & (tick["ped_x"] < 30))
+            + 2 * (rng.random(num_peds) > 0.6)
+            + (rng.random(num_peds) > 0.5)
+        )
+        tick["is_urgent"] = urgency_signals >= 6
+        tick["is_dangerous"] = (danger_signals >= 3) & self.pedestrians_red[ped_group // self.num_cameras]
+
+        # История срабатываний по слотам пешеходов (id ped_{камера}_{i})
+        counts = self.urgent_counts.reshape(-1)
+        slots = ped_group * self.max_pedestrians + ped_slot
+        counts[slots] += tick["is_urgent"]
+        tick["is_possible_false_alarm"] = (
+            (tick["ped_type"] == PEDESTRIAN_TYPES.index("подросток")) & (counts[slots] > 2)
+        )
+        return tick
+
+    def decide(self, tick):
+        """Векторная версия make_decision для всех перекрестков"""
+        size = self.size
+        num_cameras = self.num_cameras
+        groups = size * num_cameras
+        ped_group = tick["ped_group"]
+        veh_group = tick["veh_group"]
+        ped_intersection = ped_group // num_cameras
+
+        # Экстренные ситуации: опасные пешеходы и ближайшие к ним машины
+        dangerous = np.flatnonzero(tick["is_dangerous"])
+        vehicles = np.empty(len(veh_group), dtype=VEHICLE_INDEX_DTYPE)
+        vehicles["x"] = tick["veh_x"]
+        vehicles["distance_to_crosswalk"] = tick["veh_distance"]
+        nearest = VehicleSpatialIndex(vehicles, groups=veh_group).nearest(
+            tick["ped_x"][dangerous], ped_group[dangerous]
+        )
+        paired = dangerous[nearest >= 0]
+        ttc = collision_times(tick["ped_x"][paired], tick["veh_speed"][nearest[nearest >= 0]])
+        is_case = (ttc < 5.0) & ~tick["is_possible_false_alarm"][paired]
+        min_ttc = np.full(size, np.inf)
+        np.minimum.at(min_ttc, ped_intersection[paired][is_case], ttc[is_case])
+        danger_case = np.isfinite(min_ttc)
+
+        urgent_case = np.bincount(
+            ped_intersection,
+            weights=tick["is_urgent"] & ~tick["is_dangerous"] & ~tick["is_possible_false_alarm"],
+            minlength=size
+        ) > 0
+
+        # Обычный анализ трафика (как analyze_frames), затем сумма по камерам
+        posture = tick["posture"]
+        priority = self._priority_table[tick["ped_type"]]
+        priority = priority * np.where(tick["direction"] == DIRECTIONS.index("к_переходу"), 1.3, 1.0)
+        priority = priority * np.where(posture == POSTURES.index("бежит"), 1.2, 1.0)
+        priority = priority * np.where(posture == POSTURES.index("хромает"), 1.4, 1.0)
+        emergency = tick["veh_type"] == VEHICLE_TYPES.index("спецтранспорт")
+        penalty = np.where(emergency, self._emergency_table[tick["signal"]] * 2, 0.0)
+        score = (
+            np.bincount(ped_group, weights=priority, minlength=groups)
+            - np.bincount(veh_group, weights=penalty, minlength=groups)
+        )
+        bad_weather = np.isin(
+            tick["weather"], [WEATHER_CONDITIONS.index("дождь"), WEATHER_CONDITIONS.index("туман")]
+        )
+        score = np.where(bad_weather, score * 1.2, score)
+        density = (
+            np.bincount(veh_group, weights=tick["veh_speed"] / 60.0, minlength=groups)
+            / np.maximum(tick["veh_counts"], 1)
+        )
+        pedestrian_score = score.reshape(size, num_cameras).sum(axis=1)
+        traffic_score = density.reshape(size, num_cameras).sum(axis=1)
+        emergency_detected = np.bincount(veh_group // num_cameras, weights=emergency, minlength=size) > 0
+
+        critical = danger_case & (min_ttc < 3.0)
+        normal = ~danger_case & ~urgent_case
+        conditions = [
+            critical,
+            danger_case & ~critical,
+            ~danger_case & urgent_case,
+            normal & emergency_detected,
+            normal & (pedestrian_score > traffic_score)
+        ]
+        self.decisions = np.select(conditions, [0, 1, 2, 3, 4], 5).astype(np.int8)
+        self.durations = np.select(conditions, [
+            20, 15, 10, 15, np.clip(np.trunc(pedestrian_score * 4), 15, 30)
+        ], np.clip(np.trunc(traffic_score * 6), 10, 25)).astype(np.int16)
+
+        self.pedestrians_red = np.isin(self.decisions, PEDESTRIAN_RED_DECISIONS)
+        self.emergency_active |= critical
+        self.ticks += 1
+        return self.decisions, self.durations
+
+
+def _shard_main(connection, size, num_cameras, weights, seed):
+    """Цикл процесса-шарда: выполняет такты по команде родителя"""
+    batch = IntersectionBatch(size, num_cameras, weights, seed)
+    while True:
+        command = connection.recv()
+        if command == "step":
+            connection.send(batch.step())
+        elif command == "stop":
+            connection.close()
+            return
+
+
+class DistrictController:
+    """Контроллер района: перекрестки делятся на шарды по процессам"""
+
+    def __init__(self, num_intersections, shards=1, num_cameras=4, weights=None, seed=None):
+        self.num_intersections = num_intersections
+        sizes = [len(part) for part in np.array_split(np.arange(num_intersections), shards)]
+        seeds = np.random.SeedSequence(seed).spawn(shards)
+
+        self._local = None
+        self._workers = []
+        if shards == 1:
+            self._local = IntersectionBatch(num_intersections, num_cameras, weights, seeds[0])
+        else:
+            for size, shard_seed in zip(sizes, seeds):
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(
+                    target=_shard_main, args=(child, size, num_cameras, weights, shard_seed), daemon=True
+                )
+                process.start()
+                self._workers.append((process, parent))
+
+    def step(self):
+        """Один такт всего района: (коды решений, длительности)"""
+        if self._local is not None:
+            return self._local.step()
+        for _, connection in self._workers:
+            connection.send("step")
+        results = [connection.recv() for _, connection in self._workers]
+        return (
+            np.concatenate([decisions for decisions, _ in results]),
+            np.concatenate([durations for _, durations in results])
+        )
+
+    def run(self, ticks):
+        """Выполняет ticks тактов и возвращает пропускную способность"""
+        decision_counts = np.zeros(len(DECISIONS), dtype=np.int64)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            decisions, _ = self.step()
+            decision_counts += np.bincount(decisions, minlength=len(DECISIONS))
+        elapsed = time.perf_counter() - start
+        return {
+            "ticks": ticks,
+            "intersections": self.num_intersections,
+            "seconds": elapsed,
+            "decisions_per_second": self.num_intersections * ticks / elapsed if elapsed else float("inf"),
+            "decision_counts": dict(zip(DECISIONS, decision_counts.tolist()))
+        }
+
+    def close(self):
+        for process, connection in self._workers:
+            connection.send("stop")
+            process.join()
+        self._workers = []
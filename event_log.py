@@ -0,0 +1,348 @@
+# event_log.py
+"""
+ЖУРНАЛ СОБЫТИЙ БЕЗОПАСНОСТИ НА ДИСКЕ
+Сегментированный журнал только для дозаписи: записи фиксированной длины
+и таблица интернированных строк для полей с малым числом значений (тип,
+серьезность, действие). IP и детали события хранятся в файле данных
+сегмента (.dat) и удаляются вместе с ним. Закрытые сегменты отображаются
+в память (mmap) и обрабатываются как массивы NumPy без создания словарей
+Python.
+"""
+import os
+import json
+import mmap
+import struct
+import numpy as np
+from datetime import datetime
+from collections import Counter
+
+# epoch, id события, id строк (тип, серьезность, действие), затем
+# смещение в файле данных и длины ip и деталей (JSON), записанных подряд
+RECORD = struct.Struct("<dQIIIQII")
+RECORD_DTYPE = np.dtype([
+    ("epoch", "<f8"), ("id", "<u8"), ("type", "<u4"), ("severity", "<u4"), ("action", "<u4"),
+    ("data_offset", "<u8"), ("ip_length", "<u4"), ("details_length", "<u4")
+])
+STRING_HEADER = struct.Struct("<I")
+
+
+class StringTable:
+    """Таблица интернированных строк: строка хранится на диске один раз"""
+
+    def __init__(self, path):
+        self.path = path
+        self.strings = []
+        self.ids = {}
+        if os.path.exists(path):
+            self._load()
+        self._file = open(path, "ab")
+
+    def intern(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            encoded = value.encode("utf-8")
+            self._file.write(STRING_HEADER.pack(len(encoded)) + encoded)
+            self.strings.append(value)
+            self.ids[value] = string_id
+        return string_id
+
+    def lookup(self, string_id):
+        return self.strings[string_id]
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def _load(self):
+        with open(self.path, "rb") as source:
+            data = source.read()
+        offset = 0
+        while offset + STRING_HEADER.size <= len(data):
+            (length,) = STRING_HEADER.unpack_from(data, offset)
+            end = offset + STRING_HEADER.size + length
+            if end > len(data):
+                break  # оборванная запись после сбоя
+            value = data[offset + STRING_HEADER.size:end].decode("utf-8")
+            self.ids[value] = len(self.strings)
+            self.strings.append(value)
+            offset = end
+        if offset != len(data):
+            with open(self.path, "r+b") as target:
+                target.truncate(offset)
+
+
+def _map_file(path):
+    """(файл, mmap) только для чтения; пустой файл не отображается"""
+    source = open(path, "rb")
+    if os.fstat(source.fileno()).st_size == 0:
+        return source, None
+    return source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SealedSegment:
+    """Закрытый сегмент журнала, отображенный в память"""
+
+    def __init__(self, path, data_path):
+        self.path = path
+        self.data_path = data_path
+        self._file, self._map = _map_file(path)
+        self._data_file, self._data_map = _map_file(data_path)
+        self.data = self._data_map if self._data_map is not None else b""
+        count = len(self._map) // RECORD.size
+        self.records = np.frombuffer(self._map, dtype=RECORD_DTYPE, count=count)
+        self.first_epoch = float(self.records["epoch"].min())
+        self.last_epoch = float(self.records["epoch"].max())
+
+    def __len__(self):
+        return len(self.records)
+
+    def close(self):
+        self.records = None
+        self.data = None
+        for mapped in (self._map, self._data_map):
+            if mapped is None:
+                continue
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # на сегмент еще ссылаются результаты запросов - закроет сборщик мусора
+        self._file.close()
+        self._data_file.close()
+
+
+class SecurityEventLog:
+    """Долговременный журнал событий с ротацией сегментов и сроком хранения.
+
+    segment_records - число записей в сегменте до ротации;
+    retention_segments / retention_seconds - сколько закрытых сегментов
+    или секунд истории хранить (None - без ограничения).
+    """
+
+    def __init__(self, path, segment_records=100000, retention_segments=None,
+                 retention_seconds=None, fsync=False):
+        self.path = path
+        self.segment_records = segment_records
+        self.retention_segments = retention_segments
+        self.retention_seconds = retention_seconds
+        self.fsync = fsync
+        os.makedirs(path, exist_ok=True)
+
+        self.strings = StringTable(os.path.join(path, "strings.tbl"))
+        self.sealed = []
+
+        numbers = sorted(
+            int(name[len("segment_"):-len(".log")])
+            for name in os.listdir(path)
+            if name.startswith("segment_") and name.endswith(".log")
+        )
+        for number in numbers[:-1]:
+            self._seal_existing(number)
+        self._active_number = numbers[-1] if numbers else 0
+        self._open_active()
+
+    @property
+    def next_id(self):
+        """id, следующий за последним записанным событием (0 для пустого журнала)"""
+        if self._active_count:
+            with open(self._segment_path(self._active_number), "rb") as source:
+                source.seek((self._active_count - 1) * RECORD.size)
+                return RECORD.unpack(source.read(RECORD.size))[1] + 1
+        if self.sealed:
+            return int(self.sealed[-1].records["id"][-1]) + 1
+        return 0
+
+    def append(self, event):
+        """Дописывает событие монитора (словарь с полем epoch)"""
+        intern = self.strings.intern
+        ip = str(event["ip"]).encode("utf-8")
+        details = json.dumps(event["details"], ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        self._data.write(ip + details)
+        self._active.write(RECORD.pack(
+            event["epoch"],
+            event["id"],
+            intern(event["type"]),
+            intern(event["severity"]),
+            intern(event["action_taken"]),
+            self._data_size,
+            len(ip),
+            len(details)
+        ))
+        self._data_size += len(ip) + len(details)
+        self._active_count += 1
+        if self._active_count >= self.segment_records:
+            self.rotate()
+
+    def rotate(self):
+        """Закрывает активный сегмент и начинает новый"""
+        self.flush()
+        self._active.close()
+        self._data.close()
+        if self._active_count:
+            self._seal_existing(self._active_number)
+            self._active_number += 1
+        self._open_active()
+        self._apply_retention()
+
+    def flush(self):
+        # Данные раньше записей: запись не ссылается на недописанные данные
+        self.strings.flush()
+        self._data.flush()
+        if self.fsync:
+            os.fsync(self._data.fileno())
+        self._active.flush()
+        if self.fsync:
+            os.fsync(self._active.fileno())
+
+    def close(self):
+        self.flush()
+        self._active.close()
+        self._data.close()
+        self.strings.close()
+        for segment in self.sealed:
+            segment.close()
+        self.sealed = []
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.sealed) + self._active_count
+
+    def records(self, start=None, end=None):
+        """Массивы записей (по сегментам) с start <= epoch < end"""
+        for records, _ in self._segments(start, end):
+            yield records
+
+    def count_by(self, field, start=None, end=None):
+        """Распределение событий по строковому полю (type, severity, ip, action)"""
+        totals = Counter()
+        for records, data in self._segments(start, end):
+            if not len(records):
+                continue
+            if field == "ip":
+                totals.update(self._ip(record, data) for record in records)
+                continue
+            counts = np.bincount(records[field])
+            for string_id in np.flatnonzero(counts):
+                totals[self.strings.lookup(int(string_id))] += int(counts[string_id])
+        return dict(totals)
+
+    def query(self, start=None, end=None, event_type=None, limit=None):
+        """Восстанавливает события-словари; фильтрация выполняется на массивах"""
+        type_id = self.strings.ids.get(event_type) if event_type is not None else None
+        if event_type is not None and type_id is None:
+            return []
+
+        events = []
+        for records, data in self._segments(start, end):
+            if type_id is not None:
+                records = records[records["type"] == type_id]
+            for record in records:
+                events.append(self._to_event(record, data))
+                if limit is not None and len(events) >= limit:
+                    return events
+        return events
+
+    def summary(self, start=None, end=None):
+        """Сводка для отчета: число событий и распределение по серьезности"""
+        severity = self.count_by("severity", start, end)
+        return {
+            "total_events": sum(severity.values()),
+            "severity_distribution": severity
+        }
+
+    def _ip(self, record, data):
+        offset = int(record["data_offset"])
+        return bytes(data[offset:offset + int(record["ip_length"])]).decode("utf-8")
+
+    def _to_event(self, record, data):
+        lookup = self.strings.lookup
+        offset = int(record["data_offset"]) + int(record["ip_length"])
+        details = json.loads(bytes(data[offset:offset + int(record["details_length"])]).decode("utf-8"))
+        return {
+            "id": int(record["id"]),
+            "timestamp": datetime.fromtimestamp(float(record["epoch"])).isoformat(),
+            "epoch": float(record["epoch"]),
+            "type": lookup(int(record["type"])),
+            "details": details,
+            "severity": lookup(int(record["severity"])),
+            "ip": self._ip(record, data),
+            "action_taken": lookup(int(record["action"]))
+        }
+
+    def _segments(self, start, end):
+        """(записи с start <= epoch < end, данные сегмента) по сегментам"""
+        for records, data in self._segment_arrays(start, end):
+            mask = np.ones(len(records), dtype=bool)
+            if start is not None:
+                mask &= records["epoch"] >= start
+            if end is not None:
+                mask &= records["epoch"] < end
+            yield (records if mask.all() else records[mask]), data
+
+    def _segment_arrays(self, start, end):
+        for segment in self.sealed:
+            if start is not None and segment.last_epoch < start:
+                continue
+            if end is not None and segment.first_epoch >= end:
+                continue
+            yield segment.records, segment.data
+        if self._active_count:
+            self.flush()
+            with open(self._segment_path(self._active_number), "rb") as source:
+                records = np.frombuffer(source.read(self._active_count * RECORD.size), dtype=RECORD_DTYPE)
+            with open(self._data_path(self._active_number), "rb") as source:
+                data = source.read(self._data_size)
+            yield records, data
+
+    def _segment_path(self, number):
+        return os.path.join(self.path, f"segment_{number:08d}.log")
+
+    def _data_path(self, number):
+        return os.path.join(self.path, f"segment_{number:08d}.dat")
+
+    def _open_active(self):
+        path = self._segment_path(self._active_number)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size % RECORD.size:
+            # Отбрасываем оборванную запись после сбоя
+            size -= size % RECORD.size
+            with open(path, "r+b") as target:
+                target.truncate(size)
+        self._active_count = size // RECORD.size
+
+        # Данные после последней записи остались от оборванной дозаписи
+        data_size = 0
+        if self._active_count:
+            with open(path, "rb") as source:
+                source.seek(size - RECORD.size)
+                last = RECORD.unpack(source.read(RECORD.size))
+            data_size = last[5] + last[6] + last[7]
+        data_path = self._data_path(self._active_number)
+        with open(data_path, "ab") as target:
+            target.truncate(data_size)
+        self._active = open(path, "ab")
+        self._data = open(data_path, "ab")
+        self._data_size = data_size
+
+    def _seal_existing(self, number):
+        path = self._segment_path(number)
+        if os.path.getsize(path) >= RECORD.size:
+            data_path = self._data_path(number)
+            if not os.path.exists(data_path):
+                open(data_path, "ab").close()
+            self.sealed.append(SealedSegment(path, data_path))
+
+    def _apply_retention(self):
+        while self.retention_segments is not None and len(self.sealed) > self.retention_segments:
+            self._drop_oldest()
+        if self.retention_seconds is not None and self.sealed:
+            newest = self.sealed[-1].last_epoch
+            while self.sealed and self.sealed[0].last_epoch < newest - self.retention_seconds:
+                self._drop_oldest()
+
+    def _drop_oldest(self):
+        segment = self.sealed.pop(0)
+        segment.close()
+        os.remove(segment.path)
+        os.remove(segment.data_path)
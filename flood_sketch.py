@@ -0,0 +1,218 @@
+# flood_sketch.py
+"""
+ОЦЕНКА ЧАСТОТЫ ЗАПРОСОВ ПРИ ФЛУДЕ С МИЛЛИОНАМИ АДРЕСОВ
+Count-Min Sketch по скользящим интервалам времени оценивает число
+запросов каждого IP за окно, Space-Saving держит top-k самых активных
+IP. Память фиксирована и не зависит от числа источников.
+
+Границы ошибки Count-Min (width = w, depth = d, N - запросов за окно):
+оценка никогда не меньше истинного числа, а завышение не превышает
+e/w * N с вероятностью не ниже 1 - e^-d. Например, w = 16384, d = 4:
+завышение не больше 0.017% от N с вероятностью 98%.
+
+Space-Saving на k счетчиков гарантированно содержит любой IP, у
+которого больше N/k запросов, а его счетчик завышен не более чем на
+N/k (поле error).
+
+FloodSketch считает IP подозреваемым, только если обе нижние границы
+достигли порога T: гарантированный счетчик Space-Saving (counts - error)
+и оценка Count-Min за вычетом ее завышения ceil(e/w * N). Поэтому
+подозреваемый действительно прислал не меньше T запросов (по Count-Min -
+с вероятностью 1 - e^-d), а одиночные подмененные адреса точной истории
+не получают. Гарантированно обнаруживается IP, у которого за окно больше
+N/k + T и больше T + 2e/w * N запросов.
+"""
+import math
+import heapq
+import hashlib
+import numpy as np
+
+
+def _key_hash(key):
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class SlidingCountMinSketch:
+    """Count-Min Sketch по кольцу из buckets интервалов общей длиной window.
+
+    Окно скользит с шагом window / buckets: оценка покрывает последние
+    от window - window / buckets до window секунд.
+    """
+
+    def __init__(self, width=16384, depth=4, window=60.0, buckets=6):
+        self.width = width
+        self.depth = depth
+        self.window = window
+        self.buckets = buckets
+        self.bucket_seconds = window / buckets
+        self.counts = np.zeros((buckets, depth, width), dtype=np.uint32)
+        self.totals = np.zeros((depth, width), dtype=np.uint32)  # сумма живых интервалов
+        self.bucket_totals = np.zeros(buckets, dtype=np.int64)  # запросов в каждом интервале
+        self.current = None  # номер текущего интервала (время // bucket_seconds)
+        self._rows = np.arange(depth)
+
+    @classmethod
+    def from_error(cls, epsilon, delta, window=60.0, buckets=6):
+        """Размеры по допустимой ошибке: завышение <= epsilon * N
+        с вероятностью >= 1 - delta"""
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)), window, buckets)
+
+    @property
+    def nbytes(self):
+        return self.counts.nbytes + self.totals.nbytes + self.bucket_totals.nbytes
+
+    @property
+    def total(self):
+        """N - запросов в окне"""
+        return int(self.bucket_totals.sum())
+
+    def error_bound(self):
+        """Завышение оценки, не превышаемое с вероятностью 1 - e^-depth"""
+        return math.ceil(math.e / self.width * self.total)
+
+    def add(self, key, now, count=1):
+        """Учитывает count запросов key; возвращает оценку за окно"""
+        self.advance(now)
+        columns = self._columns(key)
+        self.counts[self.current % self.buckets, self._rows, columns] += count
+        self.totals[self._rows, columns] += count
+        self.bucket_totals[self.current % self.buckets] += count
+        return int(self.totals[self._rows, columns].min())
+
+    def estimate(self, key, now=None):
+        if now is not None:
+            self.advance(now)
+        return int(self.totals[self._rows, self._columns(key)].min())
+
+    def advance(self, now):
+        """Сдвигает окно: обнуляет интервалы, вышедшие за его пределы"""
+        bucket = int(now // self.bucket_seconds)
+        if self.current is None:
+            self.current = bucket
+        elif bucket > self.current:
+            for expired in range(self.current + 1, min(bucket, self.current + self.buckets) + 1):
+                slot = expired % self.buckets
+                self.totals -= self.counts[slot]
+                self.counts[slot] = 0
+                self.bucket_totals[slot] = 0
+            self.current = bucket
+
+    def _columns(self, key):
+        # Двойное хэширование: столбец строки i = h1 + i * h2
+        h1, h2 = _key_hash(key)
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+
+class SpaceSaving:
+    """Top-k самых частых ключей потока (алгоритм Space-Saving).
+
+    counts[key] - оценка сверху, errors[key] - на сколько она может быть
+    завышена. Минимальный счетчик ищется через кучу с ленивым удалением.
+    """
+
+    def __init__(self, k=1024):
+        self.k = k
+        self.counts = {}
+        self.errors = {}
+        self._heap = []  # (счетчик, ключ); устаревшие записи пропускаются
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, key, count=1):
+        """Учитывает ключ; возвращает вытесненный ключ или None"""
+        evicted = None
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.k:
+            self.counts[key] = count
+            self.errors[key] = 0
+        else:
+            evicted, minimum = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[key] = minimum + count
+            self.errors[key] = minimum
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * self.k:
+            self._rebuild()
+        return evicted
+
+    def guaranteed(self, key):
+        """Нижняя граница числа появлений ключа"""
+        return self.counts.get(key, 0) - self.errors.get(key, 0)
+
+    def top(self, n=None):
+        """[(ключ, счетчик, ошибка)] по убыванию счетчика"""
+        items = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(key, count, self.errors[key]) for key, count in items]
+
+    def decay(self):
+        """Делит счетчики пополам: top-k отражает недавний трафик"""
+        for key in self.counts:
+            self.counts[key] //= 2
+            self.errors[key] //= 2
+        self._rebuild()
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return key, count
+
+    def _rebuild(self):
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+
+class FloodSketch:
+    """Вероятностный режим DDoSProtection.
+
+    IP становится подозреваемым, когда гарантированный счетчик Space-Saving
+    и оценка Count-Min за вычетом ее погрешности достигли suspect_threshold
+    (границы - в описании модуля); точная история запросов хранится только
+    для подозреваемых (не больше top_k IP).
+    """
+
+    def __init__(self, width=16384, depth=4, window=60.0, buckets=6, top_k=1024, suspect_threshold=5):
+        if suspect_threshold < 1:
+            raise ValueError(f"Порог подозрения должен быть положительным: {suspect_threshold}")
+        self.sketch = SlidingCountMinSketch(width, depth, window, buckets)
+        self.heavy_hitters = SpaceSaving(top_k)
+        self.suspect_threshold = suspect_threshold
+        self._decay_at = None
+        self.stats = {"requests": 0, "suspect_requests": 0, "evictions": 0}
+
+    @property
+    def nbytes(self):
+        """Память счетчиков Count-Min (Space-Saving - еще top_k записей)"""
+        return self.sketch.nbytes
+
+    def observe(self, ip_address, now):
+        """Учитывает запрос; возвращает (оценка за окно, вытесненный из top-k IP)"""
+        if self._decay_at is None:
+            self._decay_at = now + self.sketch.window
+        elif now >= self._decay_at:
+            self.heavy_hitters.decay()
+            self._decay_at = now + self.sketch.window
+
+        estimate = self.sketch.add(ip_address, now)
+        evicted = self.heavy_hitters.add(ip_address)
+        self.stats["requests"] += 1
+        if evicted is not None:
+            self.stats["evictions"] += 1
+        return estimate, evicted
+
+    def is_suspect(self, ip_address, estimate):
+        """Обе нижние границы числа запросов IP достигли порога"""
+        suspect = (
+            self.heavy_hitters.guaranteed(ip_address) >= self.suspect_threshold
+            and estimate - self.sketch.error_bound() >= self.suspect_threshold
+        )
+        if suspect:
+            self.stats["suspect_requests"] += 1
+        return suspect
@@ -1,18 +1,23 @@
 # integrated_n
-import time
-import random
+import asyncio
+import numpy as np
 from cybersecurity import CyberSecuritySystem, SimulatedAttacks
-from neural_network import AdvancedTrafficAI
+from neural_network import AdvancedTrafficAI, CameraProcessingExecutor
+from traffic_runtime import AsyncTrafficRuntime
 class IntegratedTrafficSystem:
     """Объединенная система: нейросеть + кибербезопасность"""
     
-    def __init__(self):
+    def __init__(self, seed=None):
+        # Общее зерно делает воспроизводимыми и трафик, и атаки
+        seeds = np.random.SeedSequence(seed).spawn(2)
+        
         # Инициализация нейросети (твой код)
-        self.traffic_ai = AdvancedTrafficAI()
+        self.traffic_ai = AdvancedTrafficAI(seed=seeds[0])
+        self.camera_executor = CameraProcessingExecutor(self.traffic_ai)
         
         # Инициализация безопасности 
         self.security_system = CyberSecuritySystem()
-        self.attack_simulator = SimulatedAttacks()
+        self.attack_simulator = SimulatedAttacks(seed=seeds[1])
         
         # Статистика
         self.normal_cycles = 0
@@ -35,33 +40,68 @@ class IntegratedTrafficSystem:
             self.normal_cycles += 1
             return self._handle_normal_traffic()
     
-    def _handle_normal_traffic(self):
-        print(f"\n ЦИКЛ #{self.normal_cycles + self.attack_cycles}: АНАЛИЗ ТРАФИКА")
-        print("   Сканирование пешеходов и транспортных средств...")
-        
-        all_camera_data = {}
-        for camera_pos in self.traffic_ai.camera_system.camera_positions:  # ← БЕЗ .keys()
-            all_camera_data[camera_pos] = self.traffic_ai.camera_system.simulate_camera_view(
-                camera_pos, self.traffic_ai.traffic_light_state
-            )
-        
-        decision, duration, analysis = self.traffic_ai.make_decision(all_camera_data)
-        
-        # Имитация легитимного запроса к системе
-        legitimate_request = {
+    async def run_async(self, cycles=15, interval=2.0, clock=None):
+        """Событийный режим: камеры, управляющие запросы и планировщик решений
+        работают одновременно; запросы приходят раз в interval секунд часов"""
+        runtime = AsyncTrafficRuntime(
+            self.traffic_ai, self.security_system, clock, on_decision=self._on_traffic_decision,
+            camera_executor=self.camera_executor
+        )
+        traffic = asyncio.create_task(runtime.run())
+        try:
+            async for attack_scenario in self._control_requests(runtime.clock, cycles, interval):
+                if attack_scenario:
+                    self.attack_cycles += 1
+                    self._report_attack(attack_scenario)
+                    results = await runtime.submit_batch(self._attack_requests(attack_scenario))
+                    self._report_defense(results)
+                else:
+                    self.normal_cycles += 1
+                    print(f"\n ЦИКЛ #{self.normal_cycles + self.attack_cycles}: ЗАПРОС К СИСТЕМЕ")
+                    security_check = await runtime.submit(self._legitimate_request())
+                    print(f"   Безопасность: {security_check['message']}")
+        finally:
+            runtime.stop()
+            await traffic
+        return runtime.stats
+    
+    async def _control_requests(self, clock, cycles, interval):
+        """Асинхронный поток сценариев: атака (с вероятностью 30%) или None"""
+        for _ in range(cycles):
+            yield self.attack_simulator.generate_attack(chance=0.3)
+            await clock.sleep(interval)
+    
+    def _on_traffic_decision(self, decision, duration, analysis, timings):
+        print(f"\n🚦 Решение по трафику: {decision} ({duration} сек), "
+              f"цикл обработки: {timings['cycle'] * 1000:.1f} мс")
+    
+    def _legitimate_request(self):
+        """Имитация легитимного запроса к системе"""
+        return {
             "ip_address": "192.168.1.100",
             "token": list(self.security_system.authentication.authorized_tokens.keys())[0],
             "command": "traffic_analysis", 
             "user_agent": "TrafficAI/1.0",
             "required_permission": "basic_control"
         }
+    
+    def _handle_normal_traffic(self):
+        print(f"\n ЦИКЛ #{self.normal_cycles + self.attack_cycles}: АНАЛИЗ ТРАФИКА")
+        print("   Сканирование пешеходов и транспортных средств...")
+        
+        all_camera_data, camera_analyses, timings = self.camera_executor.run(
+            self.traffic_ai.traffic_light_state
+        )
+        
+        decision, duration, analysis = self.traffic_ai.make_decision(all_camera_data, camera_analyses)
         
         # Проверка безопасности (должна пройти успешно)
-        security_check = self.security_system.authenticate_request(**legitimate_request)
+        security_check = self.security_system.authenticate_request(**self._legitimate_request())
         
         print(f"   Решение по трафику: {decision}")
         print(f"   Длительность: {duration} сек")
         print(f"   Безопасность: {security_check['message']}")
+        print(f"   Цикл обработки камер: {timings['cycle'] * 1000:.1f} мс")
         
         return {
             "cycle_type": "traffic_analysis",
@@ -73,59 +113,20 @@ class IntegratedTrafficSystem:
     
     def _handle_cyber_attack(self, attack_scenario):
         """Режим отражения кибератаки"""
-        print(f"\n🛡️ ЦИКЛ #{self.normal_cycles + self.attack_cycles}: ОБНАРУЖЕНА КИБЕРАТАКА!")
-        print(f"   Тип атаки: {attack_scenario['name']}")
-        print(f"   Описание: {attack_scenario['description']}")
+        self._report_attack(attack_scenario)
         
-        blocked_count = 0
-        total_requests = 0
-        
-        # Обработка атаки в зависимости от типа
-        if attack_scenario["type"] == "ddos_flood":
-            print("   Обнаружены массовые запросы...")
-            for request in attack_scenario["requests"]:
-                total_requests += 1
-                result = self.security_system.authenticate_request(
-                    ip_address=request["ip_address"],
-                    token=request["token"],
-                    command=request["command"],
-                    user_agent=request["user_agent"]
-                )
-                if not result["authenticated"]:
-                    blocked_count += 1
-        
-        else:  # brute_force, sql_injection, reconnaissance
-            if "attempts" in attack_scenario:
-                requests = attack_scenario["attempts"]
-            else:
-                requests = [attack_scenario["attack_data"]]
-                
-            for request in requests:
-                total_requests += 1
-                result = self.security_system.authenticate_request(
-                    ip_address=request["ip_address"],
-                    token=request["token"], 
-                    command=request["command"],
-                    user_agent=request["user_agent"]
-                )
-                if not result["authenticated"]:
-                    blocked_count += 1
-        
-        self.blocked_attacks += blocked_count
+        # Весь всплеск запросов проверяется одним пакетом
+        results = self.security_system.authenticate_batch(self._attack_requests(attack_scenario))
+        blocked_count, total_requests = self._report_defense(results)
         
         # Нейросеть продолжает работать в фоне
-        all_camera_data = {}
-        for camera_pos in self.traffic_ai.camera_system.camera_positions:
-            all_camera_data[camera_pos] = self.traffic_ai.camera_system.simulate_camera_view(
-                camera_pos, self.traffic_ai.traffic_light_state
-            )
+        all_camera_data, camera_analyses, _ = self.camera_executor.run(
+            self.traffic_ai.traffic_light_state
+        )
         
-        decision, duration, analysis = self.traffic_ai.make_decision(all_camera_data)
+        decision, duration, analysis = self.traffic_ai.make_decision(all_camera_data, camera_analyses)
         
-        # Вывод результатов защиты
         success_rate = (blocked_count / total_requests) * 100 if total_requests > 0 else 0
-        print(f"   Результат защиты: {blocked_count}/{total_requests} запросов заблокировано")
-        print(f"   Эффективность: {success_rate:.1f}%")
         print(f"   Решение по трафику: {decision}")
         
         return {
@@ -138,6 +139,38 @@ class IntegratedTrafficSystem:
             "message": f"Отражено {blocked_count}/{total_requests} атак"
         }
     
+    def _report_attack(self, attack_scenario):
+        print(f"\n🛡️ ЦИКЛ #{self.normal_cycles + self.attack_cycles}: ОБНАРУЖЕНА КИБЕРАТАКА!")
+        print(f"   Тип атаки: {attack_scenario['name']}")
+        print(f"   Описание: {attack_scenario['description']}")
+        if attack_scenario["type"] == "ddos_flood":
+            print("   Обнаружены массовые запросы...")
+    
+    def _attack_requests(self, attack_scenario):
+        """Запросы сценария атаки в зависимости от типа"""
+        if attack_scenario["type"] == "ddos_flood":
+            return attack_scenario["requests"]
+        elif "attempts" in attack_scenario:  # brute_force
+            return attack_scenario["attempts"]
+        else:  # sql_injection, reconnaissance
+            return [attack_scenario["attack_data"]]
+    
+    def _report_defense(self, results):
+        """Вывод результатов защиты; возвращает (заблокировано, всего)"""
+        total_requests = len(results)
+        blocked_count = sum(1 for result in results if not result["authenticated"])
+        self.blocked_attacks += blocked_count
+        
+        success_rate = (blocked_count / total_requests) * 100 if total_requests > 0 else 0
+        print(f"   Результат защиты: {blocked_count}/{total_requests} запросов заблокировано")
+        print(f"   Эффективность: {success_rate:.1f}%")
+        return blocked_count, total_requests
+    
+    def shutdown(self):
+        """Останавливает обработку камер, дошифровывает аудит и закрывает журнал"""
+        self.camera_executor.close()
+        self.security_system.shutdown()
+    
     def get_system_stats(self):
         """Статистика работы системы"""
         total_cycles = self.normal_cycles + self.attack_cycles
@@ -158,14 +191,11 @@ def main():
     print("ЗАПУСК ИНТЕГРИРОВАННОЙ СИСТЕМЫ")
     print("="*60)
     
-    # Запускаем 15 циклов
-    for i in range(15):
-        result: dict = system.run_integrated_cycle()
-        
-        # Короткая пауза между циклами
-        time.sleep(2)
+    # 15 циклов запросов; камеры и решения по трафику идут параллельно
+    asyncio.run(system.run_async(cycles=15))
     
-    # Финальная статистика
+    # Останавливаем камеры, дошифровываем очередь аудита и собираем статистику
+    system.shutdown()
     stats = system.get_system_stats()
     print("\n" + "="*60)
     print("ФИНАЛЬНАЯ СТАТИСТИКА СИСТЕМЫ:")
@@ -1,16 +1,319 @@
 # smart_traffic_complete_system.py
+import copy
 import time
-import random
+import zlib
+import asyncio
+import threading
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
-from collections import deque
+from collections import deque, OrderedDict
+from collections.abc import Mapping
+from traffic_runtime import AsyncTrafficRuntime, process_camera
+from tracking import PedestrianTracker
+from traffic_kernels import (
+    WEATHER_ROAD_CONDITIONS, collision_kernel, most_critical, road_condition_codes
+)
+
+# Справочники категорий: в колоночном кадре категория хранится индексом в кортеже
+PEDESTRIAN_TYPES = ("пожилой", "взрослый", "подросток", "ребенок", "с_коляской", "с_тростью")
+VEHICLE_TYPES = ("легковая", "автобус", "грузовик", "мотоцикл", "спецтранспорт")
+DIRECTIONS = ("к_переходу", "от_перехода", "ожидает")
+POSTURES = ("идет", "бежит", "стоит", "хромает", "смотрит_в_телефон")
+VEHICLE_SIGNALS = ("нет", "поворотник", "торможение", "спецсигнал")
+WEATHER_CONDITIONS = ("ясно", "дождь", "туман", "ночь")
+LIGHTING_CONDITIONS = ("хорошая", "средняя", "плохая")
+
+# Веса модели принятия решений по умолчанию
+DEFAULT_TRAFFIC_WEIGHTS = {
+    "pedestrian_priority_weights": {
+        "пожилой": 0.9, "с_тростью": 1.0, "с_коляской": 0.8,
+        "ребенок": 0.7, "взрослый": 0.5, "подросток": 0.4
+    },
+    "emergency_levels": {
+        "спецсигнал": 2.0, "торможение": 0.3, "поворотник": 0.1, "нет": 0.0
+    },
+    "urgency_factors": {
+        "бегущий_пешеход": 1.5,
+        "опасное_приближение": 2.0,
+        "группа_детей": 1.3
+    }
+}
+
+PEDESTRIAN_DTYPE = np.dtype([
+    ("type", "u1"), ("x", "f8"), ("y", "f8"), ("speed", "f8"),
+    ("direction", "u1"), ("posture", "u1"),
+    ("is_urgent", "?"), ("is_dangerous", "?"), ("is_possible_false_alarm", "?")
+])
+VEHICLE_DTYPE = np.dtype([
+    ("type", "u1"), ("x", "f8"), ("y", "f8"), ("speed", "f8"),
+    ("lane", "u1"), ("signal", "u1"), ("distance_to_crosswalk", "f8")
+])
+
+class CameraFrame(Mapping):
+    """Колоночный кадр камеры: структурированные массивы NumPy с кодами категорий.
+    
+    Ведет себя как словарь simulate_camera_view: списки словарей
+    pedestrians/vehicles строятся лениво при первом обращении.
+    """
+    
+    def __init__(self, camera_id, pedestrians, vehicles, weather, lighting, timestamp=None,
+                 track_ids=None):
+        self.camera_id = camera_id
+        self.pedestrians = pedestrians  # массив PEDESTRIAN_DTYPE
+        self.vehicles = vehicles        # массив VEHICLE_DTYPE
+        self.weather = weather          # код в WEATHER_CONDITIONS
+        self.lighting = lighting        # код в LIGHTING_CONDITIONS
+        self.timestamp = timestamp or datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        self.track_ids = track_ids      # id треков пешеходов (если включено сопровождение)
+        self._dict_view = None
+    
+    @classmethod
+    def from_dict(cls, camera_data):
+        """Строит колоночный кадр из словаря simulate_camera_view"""
+        if isinstance(camera_data, CameraFrame):
+            return camera_data
+        pedestrians = np.array([
+            (PEDESTRIAN_TYPES.index(p["type"]), p["position"][0], p["position"][1], p["speed"],
+             DIRECTIONS.index(p["direction"]), POSTURES.index(p["posture"]),
+             p["is_urgent"], p["is_dangerous"], p["is_possible_false_alarm"])
+            for p in camera_data["pedestrians"]
+        ], dtype=PEDESTRIAN_DTYPE)
+        vehicles = np.array([
+            (VEHICLE_TYPES.index(v["type"]), v["position"][0], v["position"][1], v["speed"],
+             v["lane"], VEHICLE_SIGNALS.index(v["signal"]), v["distance_to_crosswalk"])
+            for v in camera_data["vehicles"]
+        ], dtype=VEHICLE_DTYPE)
+        return cls(
+            camera_data["camera_id"], pedestrians, vehicles,
+            WEATHER_CONDITIONS.index(camera_data["weather"]),
+            LIGHTING_CONDITIONS.index(camera_data["lighting"]),
+            camera_data["timestamp"]
+        )
+    
+    def pedestrian_ids(self):
+        if self.track_ids is not None:
+            return [f"ped_{self.camera_id}_{track_id}" for track_id in self.track_ids.tolist()]
+        return [f"ped_{self.camera_id}_{i}" for i in range(len(self.pedestrians))]
+    
+    def to_dict(self):
+        """Словарное представление кадра (строится один раз)"""
+        if self._dict_view is None:
+            pedestrian_ids = self.pedestrian_ids()
+            self._dict_view = {
+                "camera_id": self.camera_id,
+                "timestamp": self.timestamp,
+                "pedestrians": [
+                    {
+                        "id": pedestrian_ids[i],
+                        "type": PEDESTRIAN_TYPES[ped_type],
+                        "position": [x, y],
+                        "speed": speed,
+                        "direction": DIRECTIONS[direction],
+                        "posture": POSTURES[posture],
+                        "is_urgent": is_urgent,
+                        "is_dangerous": is_dangerous,
+                        "is_possible_false_alarm": is_false_alarm
+                    }
+                    for i, (ped_type, x, y, speed, direction, posture,
+                            is_urgent, is_dangerous, is_false_alarm) in enumerate(self.pedestrians.tolist())
+                ],
+                "vehicles": [
+                    {
+                        "id": f"veh_{self.camera_id}_{i}",
+                        "type": VEHICLE_TYPES[veh_type],
+                        "position": [x, y],
+                        "speed": speed,
+                        "lane": lane,
+                        "signal": VEHICLE_SIGNALS[signal],
+                        "distance_to_crosswalk": distance
+                    }
+                    for i, (veh_type, x, y, speed, lane, signal, distance) in enumerate(self.vehicles.tolist())
+                ],
+                "weather": WEATHER_CONDITIONS[self.weather],
+                "lighting": LIGHTING_CONDITIONS[self.lighting]
+            }
+        return self._dict_view
+    
+    def __getitem__(self, key):
+        if key in ("camera_id", "timestamp"):
+            return getattr(self, key)
+        if key == "weather":
+            return WEATHER_CONDITIONS[self.weather]
+        if key == "lighting":
+            return LIGHTING_CONDITIONS[self.lighting]
+        return self.to_dict()[key]
+    
+    def __iter__(self):
+        return iter(("camera_id", "timestamp", "pedestrians", "vehicles", "weather", "lighting"))
+    
+    def __len__(self):
+        return 6
+
+class _PedestrianRecord:
+    """Запись истории пешехода"""
+    __slots__ = ("urgent_count", "last_seen")
+    
+    def __init__(self, urgent_count=0, last_seen=0.0):
+        self.urgent_count = urgent_count
+        self.last_seen = last_seen
+
+class PedestrianHistory:
+    """История срабатываний пешеходов для защиты от ложных вызовов.
+    
+    Запись удаляется, если пешеход не появлялся дольше ttl секунд; при
+    превышении max_entries вытесняются давно не виденные (LRU). Порядок
+    OrderedDict совпадает с порядком last_seen, поэтому устаревшие записи
+    снимаются с начала за O(числа удаленных). Камеры обрабатываются
+    параллельными потоками, поэтому изменения идут под блокировкой.
+    """
+    
+    def __init__(self, ttl=300.0, max_entries=10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._records = OrderedDict()
+        self._latest = float("-inf")  # last_seen последней записи
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def observe(self, ped_id, is_urgent, now=None):
+        """Отмечает появление пешехода и возвращает его счетчик спешки"""
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            # Поток с более ранним чтением часов не нарушает порядок last_seen
+            now = self._latest = max(now, self._latest)
+            self._expire(now)
+            return self._observe(ped_id, is_urgent, now)
+    
+    def _observe(self, ped_id, is_urgent, now):
+        record = self._records.get(ped_id)
+        if record is None:
+            self.stats["misses"] += 1
+            record = self._records[ped_id] = _PedestrianRecord()
+        else:
+            self.stats["hits"] += 1
+            self._records.move_to_end(ped_id)
+        record.last_seen = now
+        if is_urgent:
+            record.urgent_count += 1
+        
+        while len(self._records) > self.max_entries:
+            self._records.popitem(last=False)
+            self.stats["evicted"] += 1
+        return record.urgent_count
+    
+    def urgent_count(self, ped_id):
+        with self._lock:
+            record = self._records.get(ped_id)
+        return record.urgent_count if record is not None else 0
+    
+    def expire(self, now=None):
+        """Удаляет записи, не обновлявшиеся дольше ttl"""
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            self._expire(now)
+    
+    def _expire(self, now):
+        records = self._records
+        while records:
+            ped_id, record = next(iter(records.items()))
+            if now - record.last_seen <= self.ttl:
+                break
+            del records[ped_id]
+            self.stats["expired"] += 1
+    
+    def subset(self, prefix):
+        """Копия записей с id на prefix (для передачи в процесс-обработчик)"""
+        subset = PedestrianHistory(self.ttl, self.max_entries)
+        with self._lock:
+            for ped_id, record in self._records.items():
+                if ped_id.startswith(prefix):
+                    subset._records[ped_id] = _PedestrianRecord(record.urgent_count, record.last_seen)
+            subset._latest = self._latest
+        return subset
+    
+    def merge(self, other):
+        """Переносит записи и статистику другой истории (результат
+        процесса-обработчика).
+        
+        Переносятся только записи, обновленные обработчиком: они
+        дописываются в конец, а last_seen при необходимости сдвигается до
+        последней записи истории (часы процессов расходятся на доли
+        секунды), чтобы expire по-прежнему мог останавливаться на первой
+        свежей записи.
+        """
+        with self._lock:
+            for name, value in other.stats.items():
+                self.stats[name] += value
+            
+            records = self._records
+            updated = []
+            for ped_id, record in other._records.items():
+                current = records.get(ped_id)
+                if current is None:
+                    changed = self._latest - record.last_seen <= self.ttl
+                else:
+                    changed = (current.last_seen, current.urgent_count) != (record.last_seen, record.urgent_count)
+                if changed:
+                    updated.append((ped_id, record))
+            updated.sort(key=lambda item: item[1].last_seen)
+            
+            for ped_id, record in updated:
+                record.last_seen = self._latest = max(record.last_seen, self._latest)
+                records[ped_id] = record
+                records.move_to_end(ped_id)
+            
+            while len(records) > self.max_entries:
+                records.popitem(last=False)
+                self.stats["evicted"] += 1
+    
+    def __contains__(self, ped_id):
+        return ped_id in self._records
+    
+    def __len__(self):
+        return len(self._records)
 
 class VirtualCameraSystem:    
-    def __init__(self):
+    """Виртуальные камеры перекрестка.
+    
+    seed задает воспроизводимую симуляцию: у каждой камеры свой генератор
+    NumPy, выведенный из seed и id камеры, поэтому поток кадров камеры
+    не зависит от порядка и параллельности обработки камер.
+    """
+    
+    def __init__(self, history_ttl=300.0, history_size=10000, tracking=False, seed=None):
         self.camera_positions = {"север", "юг", "восток", "запад"}
-        self.pedestrian_types = ["пожилой", "взрослый", "подросток", "ребенок", "с_коляской", "с_тростью"]
-        self.vehicle_types = ["легковая", "автобус", "грузовик", "мотоцикл", "спецтранспорт"]
-        self.pedestrian_history = {} 
+        self.pedestrian_types = list(PEDESTRIAN_TYPES)
+        self.vehicle_types = list(VEHICLE_TYPES)
+        self.pedestrian_history = PedestrianHistory(history_ttl, history_size)
+        # tracking=True: id пешеходов - устойчивые id треков вместо номера в списке
+        self.trackers = {} if tracking else None
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.camera_rngs = {}
+    
+    def camera_rng(self, camera_id):
+        """Генератор камеры (создается при первом обращении)"""
+        rng = self.camera_rngs.get(camera_id)
+        if rng is None:
+            rng = self.camera_rngs[camera_id] = np.random.default_rng(np.random.SeedSequence(
+                self.seed_sequence.entropy,
+                spawn_key=self.seed_sequence.spawn_key + (zlib.crc32(str(camera_id).encode("utf-8")),)
+            ))
+        return rng
+    
     def detect_urgent_behavior(self, pedestrian):
         urgency_signals = 0
         
@@ -21,7 +324,7 @@ class VirtualCameraSystem:
             urgency_signals += 3
         if pedestrian["direction"] == "к_переходу" and pedestrian["speed"] > 1.0:
             urgency_signals += 2
-        if random.random() > 0.9:  # Имитация жестов
+        if self.rng.random() > 0.9:  # Имитация жестов
             urgency_signals += 1
             
         return urgency_signals >= 6  # Порог срочности
@@ -38,11 +341,11 @@ class VirtualCameraSystem:
                 danger_signals += 3
                 
             # Не смотрит по сторонам (имитация)
-            if random.random() > 0.6:
+            if self.rng.random() > 0.6:
                 danger_signals += 2
                 
             # Разговаривает по телефону (имитация)
-            if random.random() > 0.5:
+            if self.rng.random() > 0.5:
                 danger_signals += 1
                 
             return danger_signals >= 3
@@ -56,70 +359,158 @@ class VirtualCameraSystem:
             return True
         return False
     
+    def track_pedestrians(self, camera_id, pedestrians):
+        """Связывает пешеходов кадра (массив PEDESTRIAN_DTYPE) с треками камеры:
+        история спешки привязана к треку, признаки трека проверяются
+        detect_false_alarm. Возвращает id треков."""
+        tracker = self.trackers.get(camera_id)
+        if tracker is None:
+            tracker = self.trackers[camera_id] = PedestrianTracker()
+        track_ids = tracker.update(
+            np.column_stack((pedestrians["x"], pedestrians["y"])), pedestrians["is_urgent"]
+        )
+        is_teen = pedestrians["type"] == PEDESTRIAN_TYPES.index("подросток")
+        for i, track_id in enumerate(track_ids.tolist()):
+            behavior_pattern = tracker.behavior_pattern(i)
+            pedestrians["is_possible_false_alarm"][i] = (
+                (behavior_pattern["repeated_urgent_signals"] > 2 and is_teen[i])
+                or self.detect_false_alarm(f"ped_{camera_id}_{track_id}", behavior_pattern)
+            )
+        return track_ids
+    
     def simulate_camera_view(self, camera_id, traffic_light_state):
-        pedestrians = []
-        vehicles = []
+        """Кадр камеры в виде словаря; атрибуты всех объектов генерируются
+        пакетами генератором камеры (см. simulate_camera_frame)"""
+        return self.simulate_camera_frame(camera_id, traffic_light_state).to_dict()
+
+    def simulate_camera_frame(self, camera_id, traffic_light_state,
+                              num_pedestrians=None, num_vehicles=None):
+        """Колоночная версия simulate_camera_view: кадр заполняется
+        несколькими векторными вызовами генератора NumPy камеры"""
+        rng = self.camera_rng(camera_id)
+        if num_pedestrians is None:
+            num_pedestrians = int(rng.integers(0, 9))
+        if num_vehicles is None:
+            num_vehicles = int(rng.integers(0, 11))
         
-        num_pedestrians = random.randint(0, 8)
-        num_vehicles = random.randint(0, 10)
+        pedestrians = np.zeros(num_pedestrians, dtype=PEDESTRIAN_DTYPE)
+        pedestrians["type"] = rng.integers(0, len(PEDESTRIAN_TYPES), num_pedestrians)
+        pedestrians["x"] = rng.uniform(0, 100, num_pedestrians)
+        pedestrians["y"] = rng.uniform(0, 100, num_pedestrians)
+        pedestrians["speed"] = rng.uniform(0.1, 2.5, num_pedestrians)
+        pedestrians["direction"] = rng.integers(0, len(DIRECTIONS), num_pedestrians)
+        pedestrians["posture"] = rng.integers(0, len(POSTURES), num_pedestrians)
         
-        for i in range(num_pedestrians):
-            ped_id = f"ped_{camera_id}_{i}"
-            
-            pedestrian = {
-                "id": ped_id,
-                "type": random.choice(self.pedestrian_types),
-                "position": [random.uniform(0, 100), random.uniform(0, 100)],
-                "speed": random.uniform(0.1, 2.5),
-                "direction": random.choice(["к_переходу", "от_перехода", "ожидает"]),
-                "posture": random.choice(["идет", "бежит", "стоит", "хромает", "смотрит_в_телефон"]),
-                "is_urgent": False,
-                "is_dangerous": False,
-                "is_possible_false_alarm": False
-            }
-            
-            # Анализ поведения
-            pedestrian["is_urgent"] = self.detect_urgent_behavior(pedestrian)
-            pedestrian["is_dangerous"] = self.detect_dangerous_behavior(pedestrian, traffic_light_state)
-            
-            # Обновляем историю поведения
-            if ped_id not in self.pedestrian_history:
-                self.pedestrian_history[ped_id] = {
-                    "urgent_count": 0,
-                    "last_seen": datetime.now(),
-                    "behavior_pattern": []
-                }
-            
-            if pedestrian["is_urgent"]:
-                self.pedestrian_history[ped_id]["urgent_count"] += 1
-                
-            # Проверка на ложные вызовы
-            if (self.pedestrian_history[ped_id]["urgent_count"] > 2 and 
-                pedestrian["type"] == "подросток"):
-                pedestrian["is_possible_false_alarm"] = True
-            
-            pedestrians.append(pedestrian)
-        
-        for i in range(num_vehicles):
-            vehicle = {
-                "id": f"veh_{camera_id}_{i}",
-                "type": random.choice(self.vehicle_types),
-                "position": [random.uniform(0, 100), random.uniform(0, 100)],
-                "speed": random.uniform(0, 80),
-                "lane": random.randint(1, 3),
-                "signal": random.choice(["нет", "поворотник", "торможение", "спецсигнал"]),
-                "distance_to_crosswalk": random.uniform(5, 100)
-            }
-            vehicles.append(vehicle)
+        # Анализ поведения (те же правила, что в detect_*_behavior)
+        speed = pedestrians["speed"]
+        to_crosswalk = pedestrians["direction"] == DIRECTIONS.index("к_переходу")
+        urgency_signals = (
+            2 * (speed > 2.0)
+            + 3 * (pedestrians["posture"] == POSTURES.index("бежит"))
+            + 2 * (to_crosswalk & (speed > 1.0))
+            + (rng.random(num_pedestrians) > 0.9)  # Имитация жестов
+        )
+        pedestrians["is_urgent"] = urgency_signals >= 6
+        if traffic_light_state == "красный_пешеходам":
+            danger_signals = (
+                3 * (to_crosswalk & (speed > 1.2) & (pedestrians["x"] < 30))
+                + 2 * (rng.random(num_pedestrians) > 0.6)
+                + (rng.random(num_pedestrians) > 0.5)
+            )
+            pedestrians["is_dangerous"] = danger_signals >= 3
         
-        return {
-            "camera_id": camera_id,
-            "timestamp": datetime.now().strftime("%H:%M:%S.%f")[:-3],
-            "pedestrians": pedestrians,
-            "vehicles": vehicles,
-            "weather": random.choice(["ясно", "дождь", "туман", "ночь"]),
-            "lighting": random.choice(["хорошая", "средняя", "плохая"])
-        }
+        # История срабатываний для защиты от ложных вызовов
+        track_ids = None
+        if self.trackers is not None:
+            track_ids = self.track_pedestrians(camera_id, pedestrians)
+        else:
+            history = self.pedestrian_history
+            now = history.clock()
+            urgent_counts = np.array([
+                history.observe(f"ped_{camera_id}_{i}", is_urgent, now)
+                for i, is_urgent in enumerate(pedestrians["is_urgent"].tolist())
+            ], dtype=np.int64)
+            pedestrians["is_possible_false_alarm"] = (
+                (pedestrians["type"] == PEDESTRIAN_TYPES.index("подросток")) & (urgent_counts > 2)
+            )
+        
+        vehicles = np.zeros(num_vehicles, dtype=VEHICLE_DTYPE)
+        vehicles["type"] = rng.integers(0, len(VEHICLE_TYPES), num_vehicles)
+        vehicles["x"] = rng.uniform(0, 100, num_vehicles)
+        vehicles["y"] = rng.uniform(0, 100, num_vehicles)
+        vehicles["speed"] = rng.uniform(0, 80, num_vehicles)
+        vehicles["lane"] = rng.integers(1, 4, num_vehicles)
+        vehicles["signal"] = rng.integers(0, len(VEHICLE_SIGNALS), num_vehicles)
+        vehicles["distance_to_crosswalk"] = rng.uniform(5, 100, num_vehicles)
+        
+        return CameraFrame(
+            camera_id, pedestrians, vehicles,
+            int(rng.integers(0, len(WEATHER_CONDITIONS))),
+            int(rng.integers(0, len(LIGHTING_CONDITIONS))),
+            track_ids=track_ids
+        )
+
+class VehicleSpatialIndex:
+    """Индекс транспорта кадра для поиска ближайшего по координате x.
+    
+    Учитываются только машины ближе 50 м к переходу (как в
+    find_closest_vehicle); они сортируются по x, и запрос для всех
+    пешеходов выполняется одним searchsorted. При равных расстояниях
+    выбирается машина с меньшим индексом - как при линейном поиске.
+    
+    groups позволяет держать в одном индексе машины многих кадров
+    (например, всех камер района): поиск идет только внутри группы.
+    """
+    
+    def __init__(self, vehicles, max_distance_to_crosswalk=50, groups=None):
+        if isinstance(vehicles, np.ndarray):
+            x = vehicles["x"]
+            distance = vehicles["distance_to_crosswalk"]
+        else:
+            x = np.array([vehicle["position"][0] for vehicle in vehicles], dtype=float)
+            distance = np.array([vehicle["distance_to_crosswalk"] for vehicle in vehicles], dtype=float)
+        groups = np.zeros(len(x), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+        
+        eligible = np.flatnonzero(distance < max_distance_to_crosswalk)
+        order = np.lexsort((x[eligible], groups[eligible]))
+        self.indices = eligible[order]  # исходные индексы машин по (группа, x)
+        self.x = x[self.indices]
+        self.groups = groups[self.indices]
+    
+    def nearest(self, positions_x, groups=None):
+        """Индексы ближайших машин для массива x пешеходов (-1 - подходящих нет)"""
+        positions_x = np.asarray(positions_x, dtype=float)
+        result = np.full(len(positions_x), -1, dtype=np.int64)
+        count = len(self.x)
+        if not count or not len(positions_x):
+            return result
+        groups = np.zeros(len(positions_x), dtype=np.int64) if groups is None else np.asarray(groups)
+        
+        # Составной ключ группа*шаг + x упорядочен так же, как (группа, x),
+        # если шаг больше разброса координат машин и пешеходов
+        step = float(max(np.abs(self.x).max(), np.abs(positions_x).max()) * 2 + 1)
+        keys = self.groups * step + self.x
+        
+        # Первая машина справа (x >= x пешехода) и последняя слева (x < x пешехода)
+        right = np.searchsorted(keys, groups * step + positions_x, side="left")
+        right_pos = np.minimum(right, count - 1)
+        left_pos = np.maximum(right - 1, 0)
+        has_right = (right < count) & (self.groups[right_pos] == groups)
+        has_left = (right > 0) & (self.groups[left_pos] == groups)
+        # Среди машин с одинаковым x берем первую (меньший исходный индекс)
+        left_pos = np.searchsorted(keys, keys[left_pos], side="left")
+        
+        right_distance = np.where(has_right, self.x[right_pos] - positions_x, np.inf)
+        left_distance = np.where(has_left, positions_x - self.x[left_pos], np.inf)
+        right_index = self.indices[right_pos]
+        left_index = self.indices[left_pos]
+        
+        choose_left = (left_distance < right_distance) | (
+            (left_distance == right_distance) & (left_index < right_index)
+        )
+        found = has_left | has_right
+        result[found] = np.where(choose_left, left_index, right_index)[found]
+        return result
 
 class EmergencyResponseSystem:
     """Система экстренного реагирования"""
@@ -152,28 +543,16 @@ class EmergencyResponseSystem:
             return " ПРЕДУПРЕЖДЕНИЕ НА ДИСПЛЕЕ"
 
 class AdvancedTrafficAI:
-    def __init__(self):
-        self.weights = {
-            "pedestrian_priority_weights": {
-                "пожилой": 0.9, "с_тростью": 1.0, "с_коляской": 0.8,
-                "ребенок": 0.7, "взрослый": 0.5, "подросток": 0.4
-            },
-            "emergency_levels": {
-                "спецсигнал": 2.0, "торможение": 0.3, "поворотник": 0.1, "нет": 0.0
-            },
-            "urgency_factors": {
-                "бегущий_пешеход": 1.5,
-                "опасное_приближение": 2.0,
-                "группа_детей": 1.3
-            }
-        }
+    def __init__(self, verbose=True, seed=None):
+        self.weights = copy.deepcopy(DEFAULT_TRAFFIC_WEIGHTS)
         
-        self.camera_system = VirtualCameraSystem()
+        self.camera_system = VirtualCameraSystem(seed=seed)
         self.emergency_system = EmergencyResponseSystem()
         self.traffic_light_state = "зеленый_машинам"
         
-        print("Система управления светофором инициализирована")
-        print("Модули: Анализ поведения, Экстренное реагирование, Защита от ложных вызовов")
+        if verbose:
+            print("Система управления светофором инициализирована")
+            print("Модули: Анализ поведения, Экстренное реагирование, Защита от ложных вызовов")
     
     def process_emergency_situations(self, all_camera_data):
         """Обрабатывает экстренные ситуации"""
@@ -181,13 +560,36 @@ class AdvancedTrafficAI:
         false_alarms = []
         
         for camera_id, camera_data in all_camera_data.items():
-            for pedestrian in camera_data["pedestrians"]:
+            pedestrians = camera_data["pedestrians"]
+            vehicles = camera_data["vehicles"]
+            
+            # Ближайшие машины для всех опасных пешеходов камеры - одним запросом
+            dangerous = [i for i, pedestrian in enumerate(pedestrians) if pedestrian["is_dangerous"]]
+            closest = {}
+            if dangerous and vehicles:
+                source = camera_data.vehicles if isinstance(camera_data, CameraFrame) else vehicles
+                nearest = VehicleSpatialIndex(source).nearest(
+                    [pedestrians[i]["position"][0] for i in dangerous]
+                )
+                closest = {i: vehicles[v] for i, v in zip(dangerous, nearest.tolist()) if v >= 0}
+            
+            # Время до столкновения и тормозной путь для всех пар камеры
+            pair_index = {index: n for n, index in enumerate(closest)}
+            road = WEATHER_ROAD_CONDITIONS.get(camera_data["weather"], "сухо")
+            kernel = collision_kernel(
+                [pedestrians[index]["position"][0] for index in closest],
+                [vehicle["speed"] for vehicle in closest.values()],
+                road_condition_codes([road] * len(closest))
+            )
+            
+            for index, pedestrian in enumerate(pedestrians):
                 # Проверка опасного поведения
                 if pedestrian["is_dangerous"]:
                     # Расчет времени до столкновения
-                    closest_vehicle = self.find_closest_vehicle(camera_data["vehicles"], pedestrian["position"])
+                    closest_vehicle = closest.get(index)
                     if closest_vehicle:
-                        time_to_collision = self.calculate_collision_time(pedestrian, closest_vehicle)
+                        pair = pair_index[index]
+                        time_to_collision = float(kernel["time_to_collision"][pair])
                         
                         if time_to_collision < 5.0:  # Меньше 5 секунд до столкновения
                             emergency_case = {
@@ -195,6 +597,8 @@ class AdvancedTrafficAI:
                                 "pedestrian": pedestrian,
                                 "vehicle": closest_vehicle,
                                 "time_to_collision": time_to_collision,
+                                "braking_distance": float(kernel["braking_distance"][pair]),
+                                "can_stop": bool(kernel["can_stop"][pair]),
                                 "camera": camera_id
                             }
                             
@@ -216,7 +620,7 @@ class AdvancedTrafficAI:
         return emergency_cases, false_alarms
     
     def find_closest_vehicle(self, vehicles, pedestrian_position):
-        """Находит ближайший транспорт к пешеходу"""
+        """Находит ближайший транспорт к пешеходу (эталон для VehicleSpatialIndex)"""
         if not vehicles:
             return None
             
@@ -241,7 +645,7 @@ class AdvancedTrafficAI:
         return float('inf')
     
     def process_camera_data(self, camera_data):
-        """Обрабатывает данные с камер"""
+        """Обрабатывает данные с камер (скалярная эталонная версия analyze_frames)"""
         analysis = {
             "total_pedestrians": len(camera_data["pedestrians"]),
             "pedestrian_priority_score": 0,
@@ -280,8 +684,74 @@ class AdvancedTrafficAI:
         
         return analysis
     
-    def make_decision(self, all_camera_data):
-        """Принимает решение на основе анализа всех камер"""
+    def analyze_frames(self, all_camera_data):
+        """Векторный анализ всех камер сразу.
+        
+        Объекты всех кадров складываются в общие массивы, веса берутся из
+        таблиц по кодам категорий, суммы по камерам считает bincount.
+        Результат численно совпадает с process_camera_data для каждой камеры.
+        """
+        camera_ids = list(all_camera_data.keys())
+        frames = [CameraFrame.from_dict(all_camera_data[camera_id]) for camera_id in camera_ids]
+        num_cameras = len(frames)
+        if not num_cameras:
+            return {}
+        
+        pedestrians = np.concatenate([frame.pedestrians for frame in frames])
+        vehicles = np.concatenate([frame.vehicles for frame in frames])
+        ped_counts = np.array([len(frame.pedestrians) for frame in frames])
+        veh_counts = np.array([len(frame.vehicles) for frame in frames])
+        ped_camera = np.repeat(np.arange(num_cameras), ped_counts)
+        veh_camera = np.repeat(np.arange(num_cameras), veh_counts)
+        
+        # Приоритет пешеходов: таблица весов по типу и множители поведения
+        priority_table = np.array([
+            self.weights["pedestrian_priority_weights"].get(ped_type, 0.5)
+            for ped_type in PEDESTRIAN_TYPES
+        ])
+        running = pedestrians["posture"] == POSTURES.index("бежит")
+        priority = priority_table[pedestrians["type"]]
+        priority = priority * np.where(pedestrians["direction"] == DIRECTIONS.index("к_переходу"), 1.3, 1.0)
+        priority = priority * np.where(running, 1.2, 1.0)
+        priority = priority * np.where(pedestrians["posture"] == POSTURES.index("хромает"), 1.4, 1.0)
+        
+        # Спецтранспорт снижает приоритет пешеходов пропорционально уровню сигнала
+        emergency_table = np.array([self.weights["emergency_levels"][signal] for signal in VEHICLE_SIGNALS])
+        emergency = vehicles["type"] == VEHICLE_TYPES.index("спецтранспорт")
+        emergency_penalty = np.where(emergency, emergency_table[vehicles["signal"]] * 2, 0.0)
+        
+        score = (
+            np.bincount(ped_camera, weights=priority, minlength=num_cameras)
+            - np.bincount(veh_camera, weights=emergency_penalty, minlength=num_cameras)
+        )
+        bad_weather = np.isin(
+            [frame.weather for frame in frames],
+            [WEATHER_CONDITIONS.index("дождь"), WEATHER_CONDITIONS.index("туман")]
+        )
+        score = np.where(bad_weather, score * 1.2, score)
+        
+        traffic_intensity = np.bincount(veh_camera, weights=vehicles["speed"] / 60.0, minlength=num_cameras)
+        traffic_density = traffic_intensity / np.maximum(veh_counts, 1)
+        urgent = np.bincount(ped_camera, weights=running, minlength=num_cameras)
+        emergency_vehicles = np.bincount(veh_camera, weights=emergency, minlength=num_cameras)
+        
+        return {
+            camera_id: {
+                "total_pedestrians": int(ped_counts[i]),
+                "pedestrian_priority_score": float(score[i]),
+                "emergency_vehicles": int(emergency_vehicles[i]),
+                "traffic_density": float(traffic_density[i]),
+                "urgent_pedestrians": int(urgent[i])
+            }
+            for i, camera_id in enumerate(camera_ids)
+        }
+    
+    def make_decision(self, all_camera_data, camera_analyses=None):
+        """Принимает решение на основе анализа всех камер.
+        
+        camera_analyses - уже посчитанные анализы камер (например,
+        CameraProcessingExecutor); иначе считаются через analyze_frames.
+        """
         print(f"\nАНАЛИЗ ДАННЫХ С КАМЕР:")
         print("-" * 40)
         
@@ -289,10 +759,13 @@ class AdvancedTrafficAI:
         emergency_cases, false_alarms = self.process_emergency_situations(all_camera_data)
         
         if emergency_cases:
-            most_critical = min(emergency_cases, key=lambda x: x.get("time_to_collision", float('inf')))
+            critical_index = most_critical(
+                [case.get("time_to_collision", float('inf')) for case in emergency_cases]
+            )
+            most_critical_case = emergency_cases[critical_index]
             
-            if most_critical["type"] == "опасный_пешеход":
-                ttc = most_critical["time_to_collision"]
+            if most_critical_case["type"] == "опасный_пешеход":
+                ttc = most_critical_case["time_to_collision"]
                 if ttc < 3.0:
                     decision = self.emergency_system.activate_emergency_stop("критический", ttc)
                     duration = 20
@@ -305,7 +778,7 @@ class AdvancedTrafficAI:
                     print(f"  ОПАСНАЯ СИТУАЦИЯ: Пешеход приближается к переходу на красный")
                     return decision, duration, {"emergency": True}
             
-            elif most_critical["type"] == "спешащий_пешеход":
+            elif most_critical_case["type"] == "спешащий_пешеход":
                 decision = " ПРИОРИТЕТ СПЕШАЩЕМУ ПЕШЕХОДУ"
                 duration = 10
                 print(f" СПЕШАЩИЙ ПЕШЕХОД: Увеличено время перехода")
@@ -318,8 +791,10 @@ class AdvancedTrafficAI:
             "emergency_detected": False
         }
         
-        for camera_id, camera_data in all_camera_data.items():
-            analysis = self.process_camera_data(camera_data)
+        if camera_analyses is None:
+            camera_analyses = self.analyze_frames(all_camera_data)
+        
+        for camera_id, analysis in camera_analyses.items():
             
             print(f"Камера {camera_id}:")
             print(f"   Пешеходов: {analysis['total_pedestrians']}")
@@ -348,16 +823,112 @@ class AdvancedTrafficAI:
         
         return decision, duration, total_analysis
 
+_worker_ai = None
+
+def _init_camera_worker(weights):
+    """Инициализация процесса-обработчика: своя копия ИИ"""
+    global _worker_ai
+    _worker_ai = AdvancedTrafficAI(verbose=False)
+    _worker_ai.weights = weights
+
+def _process_camera_in_worker(camera_id, traffic_light_state, history, rng):
+    """Обработка камеры в отдельном процессе; история пешеходов и генератор
+    камеры передаются туда и обратно, чтобы защита от ложных вызовов не
+    терялась, а поток кадров оставался воспроизводимым"""
+    camera_system = _worker_ai.camera_system
+    camera_system.pedestrian_history = history
+    camera_system.camera_rngs[camera_id] = rng
+    camera_data, analysis, latency = process_camera(_worker_ai, camera_id, traffic_light_state)
+    return camera_data, analysis, latency, camera_system.pedestrian_history, rng
+
+class CameraProcessingExecutor:
+    """Параллельная обработка камер перекрестка.
+    
+    backend="thread" - пул потоков над общим AdvancedTrafficAI,
+    backend="process" - пул процессов (история пешеходов синхронизируется
+    с родительским процессом после каждого цикла).
+    """
+    
+    def __init__(self, ai, backend="thread", max_workers=None):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Неизвестный тип исполнителя: {backend}")
+        self.ai = ai
+        self.backend = backend
+        if backend == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_camera_worker, initargs=(ai.weights,)
+            )
+        self.last_timings = None
+    
+    def run(self, traffic_light_state, camera_ids=None):
+        """Обрабатывает все камеры параллельно.
+        
+        Возвращает (данные камер, анализы камер, замеры времени).
+        """
+        camera_ids = list(camera_ids or self.ai.camera_system.camera_positions)
+        history = self.ai.camera_system.pedestrian_history
+        start = time.perf_counter()
+        
+        if self.backend == "thread":
+            futures = [
+                self._pool.submit(process_camera, self.ai, camera_id, traffic_light_state)
+                for camera_id in camera_ids
+            ]
+        else:
+            futures = []
+            for camera_id in camera_ids:
+                camera_history = history.subset(f"ped_{camera_id}_")
+                futures.append(self._pool.submit(
+                    _process_camera_in_worker, camera_id, traffic_light_state, camera_history,
+                    self.ai.camera_system.camera_rng(camera_id)
+                ))
+        
+        all_camera_data = {}
+        camera_analyses = {}
+        latencies = {}
+        for camera_id, future in zip(camera_ids, futures):
+            result = future.result()
+            all_camera_data[camera_id], camera_analyses[camera_id], latencies[camera_id] = result[:3]
+            if self.backend == "process":
+                history.merge(result[3])
+                self.ai.camera_system.camera_rngs[camera_id] = result[4]
+        
+        self.last_timings = {
+            "cameras": latencies,
+            "cycle": time.perf_counter() - start
+        }
+        return all_camera_data, camera_analyses, self.last_timings
+    
+    def process_camera(self, camera_id, traffic_light_state):
+        """Одна камера: в вызывающем потоке (backend="thread") или в
+        процессе-обработчике с синхронизацией истории пешеходов"""
+        if self.backend == "thread":
+            return process_camera(self.ai, camera_id, traffic_light_state)
+        camera_system = self.ai.camera_system
+        result = self._pool.submit(
+            _process_camera_in_worker, camera_id, traffic_light_state,
+            camera_system.pedestrian_history.subset(f"ped_{camera_id}_"), camera_system.camera_rng(camera_id)
+        ).result()
+        camera_system.pedestrian_history.merge(result[3])
+        camera_system.camera_rngs[camera_id] = result[4]
+        return result[:3]
+    
+    def close(self):
+        self._pool.shutdown()
+
 class CompleteTrafficSystem:
     """Полная система управления светофором"""
     
-    def __init__(self):
-        self.ai = AdvancedTrafficAI()
+    def __init__(self, camera_backend="thread", seed=None):
+        self.ai = AdvancedTrafficAI(seed=seed)
+        self.camera_executor = CameraProcessingExecutor(self.ai, camera_backend)
         self.cycle_count = 0
         self.traffic_light_state = "зеленый_машинам"
     
-    def start_system(self):
-        """Запуск полной системы"""
+    def start_system(self, clock=None):
+        """Запуск полной системы (clock - часы среды выполнения, по умолчанию реальные)"""
         print("СИСТЕМА УПРАВЛЕНИЯ СВЕТОФОРОМ С АНАЛИЗОМ ПОВЕДЕНИЯ")
         print("=" * 60)
         print("Включенные модули:")
@@ -368,27 +939,37 @@ class CompleteTrafficSystem:
         print("• Расчет тормозного пути")
         print("=" * 60)
         
-        while self.cycle_count < 8:
-            self.cycle_count += 1
-            self.run_cycle()
-            time.sleep(4)
+        asyncio.run(self.run_async(cycles=8, clock=clock))
+        self.camera_executor.close()
+    
+    async def run_async(self, cycles=8, clock=None):
+        """Камеры и планировщик решений как задачи asyncio: следующее
+        решение принимается, когда истекает длительность текущего"""
+        runtime = AsyncTrafficRuntime(
+            self.ai, clock=clock, on_decision=self._on_decision, camera_executor=self.camera_executor
+        )
+        return await runtime.run(cycles)
+    
+    def _on_decision(self, decision, duration, analysis, timings):
+        self.cycle_count += 1
+        self.traffic_light_state = self.ai.traffic_light_state
+        print(f"\nЦИКЛ РАБОТЫ #{self.cycle_count}")
+        self._report_decision(decision, duration, analysis, timings)
     
     def run_cycle(self):
         """Один цикл работы системы"""
         print(f"\nЦИКЛ РАБОТЫ #{self.cycle_count}")
         print("Анализ поведения участников движения...")
         
-        all_camera_data = {}
-        for camera_pos in self.ai.camera_system.camera_positions:
-            all_camera_data[camera_pos] = self.ai.camera_system.simulate_camera_view(
-                camera_pos, self.traffic_light_state
-            )
+        all_camera_data, camera_analyses, timings = self.camera_executor.run(self.traffic_light_state)
         
-        decision, duration, analysis = self.ai.make_decision(all_camera_data)
+        decision, duration, analysis = self.ai.make_decision(all_camera_data, camera_analyses)
         
         # Обновляем состояние светофора
         self.traffic_light_state = "красный_пешеходам" if "ПЕШЕХОД" in decision else "зеленый_машинам"
-        
+        self._report_decision(decision, duration, analysis, timings)
+    
+    def _report_decision(self, decision, duration, analysis, timings):
         print(f"\nРЕШЕНИЕ СИСТЕМЫ:")
         print(f"   {decision}")
         print(f"   Длительность: {duration} секунд")
@@ -396,6 +977,8 @@ class CompleteTrafficSystem:
             print(f"   📢 Режим: ЭКСТРЕННЫЙ")
         elif "urgent" in analysis:
             print(f"   📢 Режим: ПРИОРИТЕТНЫЙ")
+        latencies = ", ".join(f"{camera} {latency * 1000:.1f}" for camera, latency in timings["cameras"].items())
+        print(f"   Задержка камер, мс: {latencies}; цикл: {timings['cycle'] * 1000:.1f} мс")
 
 # ЗАПУСК СИСТЕМЫ
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+# shared_rate_limit.py
+"""
+ОБЩИЕ ЛИМИТЫ ЗАПРОСОВ ДЛЯ НЕСКОЛЬКИХ ПРОЦЕССОВ
+Таблица счетчиков фиксированного размера в multiprocessing.shared_memory:
+все рабочие процессы узла видят один счетчик запросов IP (скользящее окно
+по двум соседним интервалам), блокировки и наблюдение за IP.
+
+Таблица разбита на корзины по BUCKET_SLOTS записей; IP попадает в
+корзину по хэшу с секретной солью таблицы (подобрать адреса одной
+корзины заранее нельзя) и ищется только внутри нее. Чтение и запись идут
+под блокировкой полосы (корзина % числа блокировок). Записи с
+действующей блокировкой или наблюдением не вытесняются; если в корзине
+нет других, новый IP не учитывается в общей таблице (hit возвращает
+None, процесс применяет свои локальные лимиты).
+"""
+import os
+import hashlib
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+SLOT_DTYPE = np.dtype([
+    ("key", "<u8"),                # хэш IP (0 - свободная запись)
+    ("window_start", "<f8"),       # начало текущего интервала
+    ("current", "<u4"),            # запросов в текущем интервале
+    ("previous", "<u4"),           # запросов в предыдущем интервале
+    ("blocked_until", "<f8"),
+    ("suspicious_until", "<f8")
+])
+BUCKET_SLOTS = 8
+
+
+def _attach(name):
+    """Подключение к существующей памяти. Память освобождает создавший ее
+    процесс; потомки, запущенные через multiprocessing, делят с ним трекер
+    ресурсов, поэтому повторная регистрация имени ничего не меняет"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+def ip_key(ip_address, salt=b""):
+    """64-битный ненулевой ключ IP"""
+    digest = hashlib.blake2b(str(ip_address).encode("utf-8"), digest_size=8, key=salt).digest()
+    return int.from_bytes(digest, "little") | 1
+
+
+class SharedRateLimitTable:
+    """Общий для процессов счетчик запросов и список блокировок по IP.
+
+    Создается в родительском процессе и передается рабочим процессам
+    аргументом multiprocessing.Process (вместе с блокировками).
+    """
+
+    def __init__(self, buckets=8192, window=60.0, lock_stripes=64, name=None, _locks=None, _salt=None):
+        self.buckets = buckets
+        self.window = window
+        self._salt = _salt or os.urandom(16)
+        size = buckets * BUCKET_SLOTS * SLOT_DTYPE.itemsize
+        # Владелец - создавший процесс (копия объекта в fork-потомке им не является)
+        self._owner_pid = os.getpid() if name is None else None
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=size)
+            self._memory.buf[:size] = bytes(size)
+        else:
+            self._memory = _attach(name)
+        self.name = self._memory.name
+        self._locks = _locks or [multiprocessing.Lock() for _ in range(lock_stripes)]
+        self.slots = np.ndarray((buckets, BUCKET_SLOTS), dtype=SLOT_DTYPE, buffer=self._memory.buf)
+        self.stats = {"evictions": 0, "untracked": 0}
+
+    def __getstate__(self):
+        return {
+            "buckets": self.buckets, "window": self.window,
+            "name": self.name, "locks": self._locks, "salt": self._salt
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["buckets"], state["window"], name=state["name"], _locks=state["locks"],
+                      _salt=state["salt"])
+
+    def hit(self, ip_address, now):
+        """Учитывает запрос IP; возвращает оценку числа запросов за окно
+        или None, если для IP нет места в таблице"""
+        key = ip_key(ip_address, self._salt)
+        bucket = key % self.buckets
+        window_start = (now // self.window) * self.window
+        with self._locks[bucket % len(self._locks)]:
+            slot = self._find(bucket, key, now, create=True)
+            if slot is None:
+                return None
+            record = self.slots[bucket, slot]
+            start = float(record["window_start"])
+            if start < window_start:
+                record["previous"] = record["current"] if start == window_start - self.window else 0
+                record["current"] = 0
+                record["window_start"] = window_start
+            else:
+                window_start = start  # другой процесс уже открыл следующий интервал
+            record["current"] += 1
+            current = int(record["current"])
+            previous = int(record["previous"])
+        return self._estimate(previous, current, now, window_start)
+
+    def count(self, ip_address, now):
+        """Оценка числа запросов IP за окно без учета нового запроса"""
+        record = self._record(ip_address, now)
+        if record is None:
+            return 0.0
+        window_start = (now // self.window) * self.window
+        start = float(record["window_start"])
+        if start == window_start:
+            previous, current = int(record["previous"]), int(record["current"])
+        elif start == window_start - self.window:
+            previous, current = int(record["current"]), 0
+        else:
+            return 0.0
+        return self._estimate(previous, current, now, window_start)
+
+    def block(self, ip_address, until, now):
+        self._set_deadline(ip_address, "blocked_until", until, now)
+
+    def mark_suspicious(self, ip_address, until, now):
+        self._set_deadline(ip_address, "suspicious_until", until, now)
+
+    def is_blocked(self, ip_address, now):
+        record = self._record(ip_address, now)
+        return record is not None and now < record["blocked_until"]
+
+    def is_suspicious(self, ip_address, now):
+        record = self._record(ip_address, now)
+        return record is not None and now < record["suspicious_until"]
+
+    def close(self):
+        """Отключается от памяти; владелец таблицы также освобождает ее"""
+        self.slots = None
+        self._memory.close()
+        if self._owner_pid == os.getpid():
+            self._memory.unlink()
+
+    def _estimate(self, previous, current, now, window_start):
+        """Скользящее окно: доля предыдущего интервала + текущий интервал"""
+        elapsed = min(max((now - window_start) / self.window, 0.0), 1.0)
+        return previous * (1.0 - elapsed) + current
+
+    def _record(self, ip_address, now):
+        """Копия записи IP (под блокировкой: запись не бывает наполовину обновлена)"""
+        key = ip_key(ip_address, self._salt)
+        bucket = key % self.buckets
+        with self._locks[bucket % len(self._locks)]:
+            slot = self._find(bucket, key, now, create=False)
+            return None if slot is None else self.slots[bucket, slot].copy()
+
+    def _set_deadline(self, ip_address, field, until, now):
+        key = ip_key(ip_address, self._salt)
+        bucket = key % self.buckets
+        with self._locks[bucket % len(self._locks)]:
+            slot = self._find(bucket, key, now, create=True)
+            if slot is None:
+                return
+            record = self.slots[bucket, slot]
+            record[field] = max(float(record[field]), until)
+
+    def _find(self, bucket, key, now, create):
+        """Номер записи IP в корзине; при create занимает свободную или
+        вытесняет самую давнюю запись без действующих блокировок
+        (None, если таких нет)"""
+        records = self.slots[bucket]
+        keys = records["key"]
+        found = np.flatnonzero(keys == key)
+        if len(found):
+            return int(found[0])
+        if not create:
+            return None
+
+        # Свободная запись или устаревшая (старше двух окон, без блокировок)
+        inactive = (records["blocked_until"] <= now) & (records["suspicious_until"] <= now)
+        stale = (keys == 0) | ((records["window_start"] < now - 2 * self.window) & inactive)
+        if stale.any():
+            slot = int(np.argmax(stale))
+        elif inactive.any():
+            candidates = np.flatnonzero(inactive)
+            slot = int(candidates[np.argmin(records["window_start"][candidates])])
+            self.stats["evictions"] += 1
+        else:
+            self.stats["untracked"] += 1
+            return None
+        records[slot] = (key, 0.0, 0, 0, 0.0, 0.0)
+        return slot
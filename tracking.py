@@ -0,0 +1,238 @@
+# tracking.py
+"""
+СОПРОВОЖДЕНИЕ ПЕШЕХОДОВ МЕЖДУ КАДРАМИ
+Обнаружения кадра связываются с треками по предсказанной позиции
+(позиция + скорость * dt). Кандидаты отбираются сеткой ячеек размером
+с порог расстояния, стоимости считаются векторно, назначение - жадное
+или венгерским алгоритмом. Треки хранятся структурой массивов и несут
+устойчивые id и признаки поведения.
+"""
+import numpy as np
+
+ASSIGNMENT_METHODS = ("greedy", "hungarian")
+_CELL_STRIDE = 1 << 31  # ключ ячейки: cx * _CELL_STRIDE + cy
+
+
+def neighbor_pairs(points, others, radius):
+    """Пары (i, j, расстояние) точек points[i] и others[j] не дальше radius.
+
+    Точки others раскладываются по ячейкам сетки со стороной radius,
+    для каждой точки просматриваются только 9 соседних ячеек.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    others = np.asarray(others, dtype=float).reshape(-1, 2)
+    empty = np.zeros(0, dtype=np.int64)
+    if not len(points) or not len(others):
+        return empty, empty, np.zeros(0)
+
+    point_cells = np.floor(points / radius).astype(np.int64)
+    other_cells = np.floor(others / radius).astype(np.int64)
+    other_keys = other_cells[:, 0] * _CELL_STRIDE + other_cells[:, 1]
+    order = np.argsort(other_keys, kind="stable")
+    sorted_keys = other_keys[order]
+
+    point_parts, other_parts = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            keys = (point_cells[:, 0] + dx) * _CELL_STRIDE + point_cells[:, 1] + dy
+            low = np.searchsorted(sorted_keys, keys, side="left")
+            counts = np.searchsorted(sorted_keys, keys, side="right") - low
+            total = int(counts.sum())
+            if not total:
+                continue
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            point_parts.append(np.repeat(np.arange(len(points)), counts))
+            other_parts.append(order[np.repeat(low, counts) + offsets])
+    if not point_parts:
+        return empty, empty, np.zeros(0)
+
+    i = np.concatenate(point_parts)
+    j = np.concatenate(other_parts)
+    distance = np.hypot(*(points[i] - others[j]).T)
+    keep = distance <= radius
+    return i[keep], j[keep], distance[keep]
+
+
+def greedy_assignment(rows, cols, cost):
+    """Жадное назначение по возрастанию стоимости (пары заданы списком)"""
+    used_rows, used_cols = set(), set()
+    matched_rows, matched_cols = [], []
+    for k in np.argsort(cost, kind="stable").tolist():
+        row, col = int(rows[k]), int(cols[k])
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matched_rows.append(row)
+        matched_cols.append(col)
+    return np.array(matched_rows, dtype=np.int64), np.array(matched_cols, dtype=np.int64)
+
+
+def hungarian(cost):
+    """Оптимальное назначение для прямоугольной матрицы стоимостей.
+
+    Венгерский алгоритм с потенциалами, O(n^2 m); внутренний проход по
+    столбцам векторизован. Возвращает (строки, столбцы) назначенных пар.
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if not n:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    # Индексация с 1: нулевой столбец - фиктивный
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)  # строка, назначенная столбцу
+    way = np.zeros(m + 1, dtype=np.int64)
+    for row in range(1, n + 1):
+        owner[0] = row
+        column = 0
+        min_value = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = owner[column]
+            reduced = cost[current_row - 1] - u[current_row] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < min_value[1:])
+            min_value[1:][better] = reduced[better]
+            way[1:][better] = column
+            candidates = np.where(free, min_value[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            min_value[1:][free] -= delta
+            column = next_column
+            if owner[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    assigned = np.flatnonzero(owner[1:])
+    rows, cols = owner[1:][assigned] - 1, assigned
+    return (cols, rows) if transposed else (rows, cols)
+
+
+class PedestrianTracker:
+    """Сопровождение пешеходов одной камеры.
+
+    max_distance - порог связывания (м) и сторона ячейки сетки отбора;
+    max_missed - сколько кадров подряд трек живет без обнаружения;
+    group_radius - радиус, в котором 3 и более пешеходов считаются группой.
+    """
+
+    def __init__(self, max_distance=5.0, max_missed=2, frame_interval=1.0,
+                 method="greedy", group_radius=2.0):
+        if method not in ASSIGNMENT_METHODS:
+            raise ValueError(f"Неизвестный метод назначения: {method}")
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.frame_interval = frame_interval
+        self.method = method
+        self.group_radius = group_radius
+        self.next_id = 0
+
+        # Треки: структура массивов
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))
+        self.missed = np.zeros(0, dtype=np.int32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.urgent_counts = np.zeros(0, dtype=np.int32)
+
+        self.last_rows = np.zeros(0, dtype=np.int64)  # строка трека для обнаружений кадра
+        self.last_group_activity = np.zeros(0, dtype=bool)
+        self.stats = {"frames": 0, "detections": 0, "matched": 0, "created": 0, "dropped": 0}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, positions, is_urgent=None, dt=None):
+        """Связывает обнаружения кадра с треками; возвращает id треков"""
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        count = len(positions)
+        is_urgent = np.zeros(count, dtype=bool) if is_urgent is None else np.asarray(is_urgent, dtype=bool)
+        dt = self.frame_interval if dt is None else dt
+
+        predicted = self.positions + self.velocities * dt
+        det_index, track_index, distance = neighbor_pairs(positions, predicted, self.max_distance)
+        matched_det, matched_track = self._assign(det_index, track_index, distance, count)
+
+        # Обновление сопоставленных треков
+        self.velocities[matched_track] = (positions[matched_det] - self.positions[matched_track]) / dt
+        self.positions[matched_track] = positions[matched_det]
+        self.missed += 1
+        self.missed[matched_track] = 0
+        self.hits[matched_track] += 1
+        self.urgent_counts[matched_track] += is_urgent[matched_det]
+
+        # Новые треки для несопоставленных обнаружений
+        new_det = np.setdiff1d(np.arange(count), matched_det)
+        new_ids = np.arange(self.next_id, self.next_id + len(new_det))
+        self.next_id += len(new_det)
+        first_new = len(self.ids)
+        self.ids = np.concatenate([self.ids, new_ids])
+        self.positions = np.concatenate([self.positions, positions[new_det]])
+        self.velocities = np.concatenate([self.velocities, np.zeros((len(new_det), 2))])
+        self.missed = np.concatenate([self.missed, np.zeros(len(new_det), dtype=np.int32)])
+        self.hits = np.concatenate([self.hits, np.ones(len(new_det), dtype=np.int32)])
+        self.urgent_counts = np.concatenate([self.urgent_counts, is_urgent[new_det].astype(np.int32)])
+
+        rows = np.empty(count, dtype=np.int64)
+        rows[matched_det] = matched_track
+        rows[new_det] = np.arange(first_new, first_new + len(new_det))
+
+        # Удаление потерянных треков
+        alive = self.missed <= self.max_missed
+        if not alive.all():
+            remap = np.cumsum(alive) - 1
+            rows = remap[rows]
+            for name in ("ids", "positions", "velocities", "missed", "hits", "urgent_counts"):
+                setattr(self, name, getattr(self, name)[alive])
+            self.stats["dropped"] += int((~alive).sum())
+
+        # Групповая активность: рядом еще минимум двое
+        group_i, _, _ = neighbor_pairs(positions, positions, self.group_radius)
+        self.last_group_activity = np.bincount(group_i, minlength=count) >= 3  # вместе с самим собой
+        self.last_rows = rows
+
+        self.stats["frames"] += 1
+        self.stats["detections"] += count
+        self.stats["matched"] += len(matched_det)
+        self.stats["created"] += len(new_det)
+        return self.ids[rows]
+
+    def behavior_pattern(self, detection):
+        """Признаки поведения трека обнаружения detection из последнего кадра
+        (формат detect_false_alarm)"""
+        row = self.last_rows[detection]
+        return {
+            "repeated_urgent_signals": int(self.urgent_counts[row]),
+            "group_activity": bool(self.last_group_activity[detection]),
+            "frames_tracked": int(self.hits[row])
+        }
+
+    def _assign(self, det_index, track_index, distance, count):
+        if not len(distance):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        if self.method == "greedy":
+            return greedy_assignment(det_index, track_index, distance)
+
+        # Венгерский алгоритм на плотной матрице кандидатов; пары вне
+        # порога получают стоимость, которая заведомо хуже любой допустимой
+        rows, det_local = np.unique(det_index, return_inverse=True)
+        cols, track_local = np.unique(track_index, return_inverse=True)
+        outside = self.max_distance * (len(rows) + len(cols) + 1) + 1
+        cost = np.full((len(rows), len(cols)), outside)
+        cost[det_local, track_local] = distance
+        assigned_rows, assigned_cols = hungarian(cost)
+        valid = cost[assigned_rows, assigned_cols] <= self.max_distance
+        return rows[assigned_rows[valid]], cols[assigned_cols[valid]]
@@ -0,0 +1,61 @@
+# traffic_kernels.py
+"""
+ВЕКТОРНЫЕ ЯДРА РАСЧЕТА СТОЛКНОВЕНИЙ
+Время до столкновения, тормозной путь и возможность остановиться
+для всех пар пешеход-транспорт одним вызовом NumPy.
+"""
+import numpy as np
+
+# Состояние дороги кодируется индексом в ROAD_CONDITIONS
+ROAD_CONDITIONS = ("сухо", "дождь", "лед")
+FRICTION_COEFFICIENTS = np.array([0.7, 0.4, 0.1])
+GRAVITY = 9.8
+
+# Состояние дороги по погоде с камеры
+WEATHER_ROAD_CONDITIONS = {"дождь": "дождь"}
+
+
+def road_condition_codes(conditions):
+    """Коды состояний дороги; неизвестное состояние считается сухим"""
+    return np.array(
+        [ROAD_CONDITIONS.index(c) if c in ROAD_CONDITIONS else 0 for c in conditions],
+        dtype=np.int64
+    )
+
+
+def collision_times(distances, vehicle_speeds):
+    """Время до столкновения, с (скорость в км/ч; inf для стоящих машин)"""
+    distances = np.asarray(distances, dtype=float)
+    speeds_ms = np.asarray(vehicle_speeds, dtype=float) / 3.6
+    moving = speeds_ms > 0
+    return np.where(moving, distances / np.where(moving, speeds_ms, 1.0), np.inf)
+
+
+def braking_distances(vehicle_speeds, road_codes=None):
+    """Тормозной путь, м (та же формула, что calculate_braking_distance)"""
+    speeds_ms = np.asarray(vehicle_speeds, dtype=float) / 3.6
+    if road_codes is None:
+        friction = FRICTION_COEFFICIENTS[0]
+    else:
+        friction = FRICTION_COEFFICIENTS[np.asarray(road_codes, dtype=np.int64)]
+    return (speeds_ms ** 2) / (2 * friction * GRAVITY)
+
+
+def collision_kernel(distances, vehicle_speeds, road_codes=None):
+    """Все показатели для пар сразу: время до столкновения, тормозной путь
+    и флаг "успевает остановиться" (тормозной путь не длиннее дистанции)"""
+    distances = np.asarray(distances, dtype=float)
+    braking = braking_distances(vehicle_speeds, road_codes)
+    return {
+        "time_to_collision": collision_times(distances, vehicle_speeds),
+        "braking_distance": braking,
+        "can_stop": braking <= distances
+    }
+
+
+def most_critical(times_to_collision):
+    """Индекс случая с минимальным временем до столкновения (первый при равенстве)"""
+    times = np.asarray(times_to_collision, dtype=float)
+    if not len(times):
+        return None
+    return int(np.argmin(times))
@@ -0,0 +1,196 @@
+# traffic_runtime.py
+"""
+АСИНХРОННАЯ СРЕДА ВЫПОЛНЕНИЯ
+Потоки кадров камер, управляющие запросы к системе безопасности и
+планировщик решений работают как параллельные задачи asyncio.
+Планировщик срабатывает по длительности принятого решения, а время
+берется из подключаемых часов (ScaledClock ускоряет время в тестах).
+Часы возвращают время epoch: им же отмечаются запросы к системе
+безопасности, поэтому ее окна и блокировки идут в том же времени.
+"""
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RealClock:
+    """Реальное время"""
+
+    def time(self):
+        return time.time()
+
+    async def sleep(self, delay):
+        await asyncio.sleep(max(delay, 0))
+
+
+class ScaledClock(RealClock):
+    """Ускоренное время: speedup симулированных секунд за одну реальную"""
+
+    def __init__(self, speedup=100.0):
+        self.speedup = speedup
+        self._origin = time.time()
+        self._start = time.monotonic()
+
+    def time(self):
+        return self._origin + (time.monotonic() - self._start) * self.speedup
+
+    async def sleep(self, delay):
+        await asyncio.sleep(max(delay, 0) / self.speedup)
+
+
+def process_camera(ai, camera_id, traffic_light_state):
+    """Съемка, анализ поведения и оценка одной камеры с замером задержки"""
+    start = time.perf_counter()
+    camera_data = ai.camera_system.simulate_camera_view(camera_id, traffic_light_state)
+    analysis = ai.process_camera_data(camera_data)
+    return camera_data, analysis, time.perf_counter() - start
+
+
+class AsyncTrafficRuntime:
+    """Событийный цикл управления перекрестком.
+
+    ai - AdvancedTrafficAI, security - CyberSecuritySystem (необязательно),
+    on_decision(decision, duration, analysis, timings) - вызывается после
+    каждого решения планировщика; camera_executor - CameraProcessingExecutor,
+    обрабатывающий кадры (без него камеры обрабатываются в пуле среды).
+    """
+
+    def __init__(self, ai, security=None, clock=None, frame_interval=1.0,
+                 camera_ids=None, on_decision=None, max_workers=None, camera_executor=None):
+        self.ai = ai
+        self.security = security
+        self.camera_executor = camera_executor
+        self.clock = clock or RealClock()
+        self.frame_interval = frame_interval
+        self.camera_ids = list(camera_ids or ai.camera_system.camera_positions)
+        self.on_decision = on_decision
+        self.max_workers = max_workers
+
+        self.latest = {}  # camera_id -> (данные камеры, анализ, задержка)
+        self.decisions = []
+        self.stats = {"frames": 0, "requests": 0, "blocked_requests": 0, "decisions": 0}
+        self._requests = asyncio.Queue()
+        self._frames_ready = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._pool = None
+
+    async def camera_feed(self, camera_id):
+        """Асинхронный поток кадров камеры с периодом frame_interval"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = self.clock.time()
+            if self.camera_executor is not None:
+                frame = loop.run_in_executor(
+                    self._pool, self.camera_executor.process_camera, camera_id, self.ai.traffic_light_state
+                )
+            else:
+                frame = loop.run_in_executor(
+                    self._pool, process_camera, self.ai, camera_id, self.ai.traffic_light_state
+                )
+            yield await frame
+            await self.clock.sleep(self.frame_interval - (self.clock.time() - start))
+
+    async def submit(self, request):
+        """Управляющий запрос (аргументы authenticate_request) -> результат проверки"""
+        future = asyncio.get_running_loop().create_future()
+        await self._requests.put((request, future))
+        return await future
+
+    async def submit_batch(self, requests):
+        return list(await asyncio.gather(*(self.submit(request) for request in requests)))
+
+    async def serve(self, requests):
+        """Обрабатывает асинхронный поток запросов и выдает результаты по порядку"""
+        async for request in requests:
+            yield await self.submit(request)
+
+    def stop(self):
+        """Останавливает run() после текущего шага"""
+        self._stopped.set()
+
+    async def run(self, cycles=None):
+        """Запускает камеры, обработку запросов и планировщик.
+
+        cycles - число решений до остановки (None - до вызова stop()).
+        """
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        tasks = [asyncio.create_task(self._consume_camera(camera_id)) for camera_id in self.camera_ids]
+        if self.security is not None:
+            tasks.append(asyncio.create_task(self._serve_requests()))
+        try:
+            await self._schedule_decisions(cycles)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._pool.shutdown()
+        return self.stats
+
+    async def _consume_camera(self, camera_id):
+        async for camera_result in self.camera_feed(camera_id):
+            self.latest[camera_id] = camera_result
+            self.stats["frames"] += 1
+            if len(self.latest) == len(self.camera_ids):
+                self._frames_ready.set()
+
+    async def _serve_requests(self):
+        """Накопившиеся запросы проверяются одним пакетом authenticate_batch
+        в пуле потоков (шифрование аудита не блокирует событийный цикл);
+        следующий пакет отправляется только после завершения предыдущего.
+        Время пакета берется из часов среды"""
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._requests.get()]
+            while not self._requests.empty():
+                pending.append(self._requests.get_nowait())
+            try:
+                results = await loop.run_in_executor(
+                    self._pool, self.security.authenticate_batch,
+                    [request for request, _ in pending], self.clock.time()
+                )
+            except Exception as error:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, future), result in zip(pending, results):
+                if not future.done():
+                    future.set_result(result)
+            self.stats["requests"] += len(results)
+            self.stats["blocked_requests"] += sum(1 for result in results if not result["authenticated"])
+
+    async def _schedule_decisions(self, cycles):
+        if not await self._wait_or_stop(self._frames_ready.wait()):
+            return
+        while cycles is None or self.stats["decisions"] < cycles:
+            start = time.perf_counter()
+            all_camera_data = {camera_id: self.latest[camera_id][0] for camera_id in self.camera_ids}
+            camera_analyses = {camera_id: self.latest[camera_id][1] for camera_id in self.camera_ids}
+            decision, duration, analysis = self.ai.make_decision(all_camera_data, camera_analyses)
+
+            # Обновляем состояние светофора
+            self.ai.traffic_light_state = "красный_пешеходам" if "ПЕШЕХОД" in decision else "зеленый_машинам"
+            timings = {
+                "cameras": {camera_id: self.latest[camera_id][2] for camera_id in self.camera_ids},
+                "cycle": time.perf_counter() - start
+            }
+            self.decisions.append({
+                "time": self.clock.time(), "decision": decision, "duration": duration
+            })
+            self.stats["decisions"] += 1
+            if self.on_decision is not None:
+                self.on_decision(decision, duration, analysis, timings)
+
+            # Следующее решение - когда истечет длительность текущего
+            if not await self._wait_or_stop(self.clock.sleep(duration)):
+                return
+
+    async def _wait_or_stop(self, awaitable):
+        """Ждет awaitable; False, если раньше пришла остановка"""
+        waiter = asyncio.ensure_future(awaitable)
+        stopper = asyncio.ensure_future(self._stopped.wait())
+        await asyncio.wait({waiter, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        for task in (waiter, stopper):
+            task.cancel()
+        return not self._stopped.is_set()
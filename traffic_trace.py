@@ -0,0 +1,268 @@
+# traffic_trace.py
+"""
+ЗАПИСЬ И ВОСПРОИЗВЕДЕНИЕ НАГРУЗКИ
+Бинарная трасса из записей с префиксом длины: кадры камер (колонки
+массивов PEDESTRIAN_DTYPE / VEHICLE_DTYPE подряд), запросы к системе
+безопасности и метки конца цикла. Воспроизведение читает файл через
+mmap и прогоняет записанный трафик через make_decision и
+authenticate_request без генерации данных.
+"""
+import os
+import mmap
+import time
+import struct
+import contextlib
+import numpy as np
+from datetime import datetime
+
+from neural_network import CameraFrame, PEDESTRIAN_DTYPE, VEHICLE_DTYPE
+
+MAGIC = b"TRTRACE1"
+RECORD_HEADER = struct.Struct("<IBd")  # длина данных, вид записи, epoch
+FRAME_HEADER = struct.Struct("<BBII")  # погода, освещение, пешеходов, машин
+STRING_LENGTH = struct.Struct("<H")
+NONE_STRING = 0xFFFF
+
+KIND_FRAME = 1
+KIND_REQUEST = 2
+KIND_CYCLE_END = 3
+
+REQUEST_FIELDS = ("ip_address", "token", "command", "user_agent", "required_permission")
+
+
+def _pack_string(value):
+    if value is None:
+        return STRING_LENGTH.pack(NONE_STRING)
+    encoded = str(value).encode("utf-8")
+    return STRING_LENGTH.pack(len(encoded)) + encoded
+
+
+def _unpack_string(buffer, offset):
+    (length,) = STRING_LENGTH.unpack_from(buffer, offset)
+    offset += STRING_LENGTH.size
+    if length == NONE_STRING:
+        return None, offset
+    return bytes(buffer[offset:offset + length]).decode("utf-8"), offset + length
+
+
+class TraceRecorder:
+    """Запись трассы: кадры камер, циклы решений и запросы"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self.records = 0
+
+    def record_frame(self, camera_data, epoch=None):
+        """Кадр камеры: словарь simulate_camera_view или CameraFrame"""
+        frame = CameraFrame.from_dict(camera_data)
+        parts = [
+            FRAME_HEADER.pack(frame.weather, frame.lighting, len(frame.pedestrians), len(frame.vehicles)),
+            _pack_string(frame.camera_id)
+        ]
+        # Колоночная раскладка: значения каждого поля подряд
+        for records in (frame.pedestrians, frame.vehicles):
+            for name in records.dtype.names:
+                parts.append(np.ascontiguousarray(records[name]).tobytes())
+        self._write(KIND_FRAME, b"".join(parts), epoch)
+
+    def record_cycle(self, all_camera_data, epoch=None):
+        """Все камеры одного цикла (вход make_decision)"""
+        epoch = time.time() if epoch is None else epoch
+        for camera_data in all_camera_data.values():
+            self.record_frame(camera_data, epoch)
+        self._write(KIND_CYCLE_END, b"", epoch)
+
+    def record_request(self, request, epoch=None):
+        """Запрос с полями authenticate_request"""
+        self._write(KIND_REQUEST, b"".join(_pack_string(request.get(field)) for field in REQUEST_FIELDS), epoch)
+
+    def record_requests(self, requests, epoch=None):
+        epoch = time.time() if epoch is None else epoch
+        for request in requests:
+            self.record_request(request, epoch)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, kind, payload, epoch):
+        epoch = time.time() if epoch is None else epoch
+        self._file.write(RECORD_HEADER.pack(len(payload), kind, epoch) + payload)
+        self.records += 1
+
+
+class TraceReplayer:
+    """Воспроизведение трассы, отображенной в память"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Файл не является трассой: {path}")
+
+        # Индекс записей: (вид, epoch, смещение данных, длина)
+        self.index = []
+        offset = len(MAGIC)
+        size = len(self._map)
+        while offset + RECORD_HEADER.size <= size:
+            length, kind, epoch = RECORD_HEADER.unpack_from(self._map, offset)
+            start = offset + RECORD_HEADER.size
+            if start + length > size:
+                break  # оборванная запись в конце файла
+            self.index.append((kind, epoch, start, length))
+            offset = start + length
+
+    def __len__(self):
+        return len(self.index)
+
+    def frames(self):
+        for kind, epoch, start, _ in self.index:
+            if kind == KIND_FRAME:
+                yield self._decode_frame(start, epoch)
+
+    def cycles(self):
+        """Входы make_decision: {camera_id: CameraFrame} на каждый цикл"""
+        cycle = {}
+        for kind, epoch, start, _ in self.index:
+            if kind == KIND_FRAME:
+                frame = self._decode_frame(start, epoch)
+                cycle[frame.camera_id] = frame
+            elif kind == KIND_CYCLE_END:
+                yield cycle
+                cycle = {}
+
+    def requests(self):
+        for kind, _, start, _ in self.index:
+            if kind == KIND_REQUEST:
+                request = {}
+                offset = start
+                for field in REQUEST_FIELDS:
+                    request[field], offset = _unpack_string(self._map, offset)
+                yield request
+
+    def replay_decisions(self, ai, quiet=True):
+        """Прогон записанных циклов через make_decision на полной скорости"""
+        cycles = list(self.cycles())
+        latencies = []
+        with _maybe_quiet(quiet):
+            for all_camera_data in cycles:
+                start = time.perf_counter()
+                ai.make_decision(all_camera_data)
+                latencies.append(time.perf_counter() - start)
+        return _latency_stats(latencies)
+
+    def replay_requests(self, security_system, batch_size=None, quiet=True):
+        """Прогон записанных запросов через authenticate_request
+        (или authenticate_batch пакетами по batch_size)"""
+        requests = list(self.requests())
+        latencies = []
+        with _maybe_quiet(quiet):
+            if batch_size is None:
+                for request in requests:
+                    start = time.perf_counter()
+                    security_system.authenticate_request(**request)
+                    latencies.append(time.perf_counter() - start)
+            else:
+                for i in range(0, len(requests), batch_size):
+                    batch = requests[i:i + batch_size]
+                    start = time.perf_counter()
+                    security_system.authenticate_batch(batch)
+                    latencies.extend([(time.perf_counter() - start) / len(batch)] * len(batch))
+        return _latency_stats(latencies)
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # на данные еще ссылаются кадры - закроет сборщик мусора
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _decode_frame(self, start, epoch):
+        weather, lighting, num_pedestrians, num_vehicles = FRAME_HEADER.unpack_from(self._map, start)
+        camera_id, offset = _unpack_string(self._map, start + FRAME_HEADER.size)
+
+        arrays = []
+        for dtype, count in ((PEDESTRIAN_DTYPE, num_pedestrians), (VEHICLE_DTYPE, num_vehicles)):
+            records = np.empty(count, dtype=dtype)
+            for name in dtype.names:
+                field_dtype = dtype.fields[name][0]
+                records[name] = np.frombuffer(self._map, dtype=field_dtype, count=count, offset=offset)
+                offset += count * field_dtype.itemsize
+            arrays.append(records)
+
+        return CameraFrame(
+            camera_id, arrays[0], arrays[1], weather, lighting,
+            datetime.fromtimestamp(epoch).strftime("%H:%M:%S.%f")[:-3]
+        )
+
+
+def record_simulation(path, cycles, ai, attack_simulator=None, security_system=None, attack_chance=0.3):
+    """Записывает cycles циклов симуляции: кадры всех камер и запросы
+    (легитимный запрос либо запросы атаки) на каждый цикл.
+
+    Легитимный токен выпущен security_system: система, на которой трасса
+    воспроизводится, должна иметь тот же jwt_secret."""
+    legitimate_token = None
+    if security_system is not None:
+        legitimate_token = next(iter(security_system.authentication.authorized_tokens), None)
+
+    with TraceRecorder(path) as recorder:
+        for _ in range(cycles):
+            epoch = time.time()
+            recorder.record_cycle({
+                camera_id: ai.camera_system.simulate_camera_frame(camera_id, ai.traffic_light_state)
+                for camera_id in sorted(ai.camera_system.camera_positions)
+            }, epoch)
+
+            attack = attack_simulator.generate_attack(attack_chance) if attack_simulator else None
+            if attack is None:
+                recorder.record_request({
+                    "ip_address": "192.168.1.100",
+                    "token": legitimate_token or "",
+                    "command": "traffic_analysis",
+                    "user_agent": "TrafficAI/1.0",
+                    "required_permission": "basic_control"
+                }, epoch)
+            else:
+                attack_simulator.attack_active = False
+                requests = attack.get("requests") or attack.get("attempts") or [attack["attack_data"]]
+                recorder.record_requests(requests, epoch)
+    return path
+
+
+@contextlib.contextmanager
+def _maybe_quiet(quiet):
+    if not quiet:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _latency_stats(latencies):
+    latencies = np.asarray(latencies)
+    total = float(latencies.sum())
+    if not len(latencies):
+        return {"count": 0, "seconds": 0.0, "per_second": 0.0, "p50_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "count": len(latencies),
+        "seconds": total,
+        "per_second": len(latencies) / total if total else float("inf"),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000)
+    }